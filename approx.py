@@ -0,0 +1,115 @@
+# Modo aproximado (TIENDAEUR_APPROX=1) con una muestra estratificada.
+#
+# Al cargar los datos se toma una muestra por estrato device_type × category
+# × country: proporcional al tamaño del estrato y con un mínimo de filas en
+# cada uno, así ningún país o categoría pequeño queda fuera. Cada fila
+# muestreada pesa N_h / n_h (filas del estrato / filas tomadas).
+#
+# Las sumas por grupo se estiman con el estimador estratificado y su
+# intervalo de confianza del 95 %; el scatter, con el histograma ponderado
+# de la muestra. pages/dashboard.py envía primero la estimación y después el
+# resultado exacto, calculado aparte (ver `progressive` y `swap_exact`).
+import os
+
+import numpy as np
+import pandas as pd
+
+from crossfilter import date_bounds
+
+APPROX = os.environ.get("TIENDAEUR_APPROX") == "1"
+SAMPLE_ROWS = int(os.environ.get("TIENDAEUR_SAMPLE_ROWS", 100_000))
+MIN_STRATUM_ROWS = 30
+STRATA = ("device_type", "category", "country")
+# Cuantil normal del intervalo de confianza del 95 %.
+Z_95 = 1.96
+
+
+class StratifiedSample:
+    """Muestra estratificada de un DataFrame de pedidos con el peso de cada fila."""
+
+    def __init__(self, df, columns=STRATA, size=SAMPLE_ROWS, seed=0):
+        self.columns = tuple(columns)
+        self.total = len(df)
+        codes = np.zeros(len(df), dtype=np.int64)
+        for column in columns:
+            column_codes, uniques = pd.factorize(df[column], sort=True)
+            # Los nulos (-1) forman su propio nivel.
+            codes = codes * (len(uniques) + 1) + np.where(column_codes < 0, len(uniques), column_codes)
+        # Códigos de estrato consecutivos (solo las combinaciones presentes).
+        present = np.bincount(codes) > 0
+        stratum = (np.cumsum(present) - 1)[codes].astype(np.int16 if present.sum() < 2**15 else np.int64)
+        self.population = np.bincount(stratum)
+        self.taken = np.minimum(
+            self.population,
+            np.maximum(np.round(size * self.population / max(len(df), 1)).astype(np.int64), MIN_STRATUM_ROWS),
+        )
+        # Permutación aleatoria y orden estable por estrato: dentro de cada
+        # estrato las filas quedan en orden aleatorio y se toman las n_h primeras.
+        shuffled = np.random.default_rng(seed).permutation(len(df))
+        order = shuffled[np.argsort(stratum[shuffled], kind="stable")]
+        starts = np.concatenate([[0], np.cumsum(self.population)[:-1]])
+        rank = np.arange(len(df)) - starts[stratum[order]]
+        picked = np.sort(order[rank < self.taken[stratum[order]]])
+
+        # Valores de cada estrato (los de su primera fila).
+        first = df.iloc[order[starts]]
+        self.strata = {column: first[column].to_numpy() for column in columns}
+        self.rows = df.iloc[picked][list(columns) + ["date", "cost", "profit"]].reset_index(drop=True)
+        self.stratum = stratum[picked]
+        self.weight = (self.population / self.taken)[self.stratum]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def mask(self, filters, window=None):
+        """Filas de la muestra que cumplen `filters` (ver crossfilter.py) y la ventana del zoom."""
+        rows = self.rows
+        mask = np.ones(len(rows), dtype=bool)
+        for column in self.columns:
+            values = filters.get(column)
+            if values is not None:
+                mask &= rows[column].isin(values).to_numpy()
+        if filters.get("date") is not None:
+            start, end = date_bounds(filters["date"])
+            mask &= ((rows["date"] >= start) & (rows["date"] < end)).to_numpy()
+        cost, profit = rows["cost"].to_numpy(), rows["profit"].to_numpy()
+        for box in (filters.get("window"), window):
+            if box is None:
+                continue
+            for values, axis_range in zip((cost, profit), box):
+                if axis_range is not None:
+                    low, high = sorted(axis_range)
+                    mask &= (values >= low) & (values <= high)
+        return mask
+
+    def grouped_sum(self, filters, by, measure):
+        """Suma estimada de `measure` por `by` con la semiamplitud del IC 95 %.
+
+        `by` es una de las columnas de los estratos, así cada estrato cae
+        entero en un grupo: el total y la varianza del grupo son las sumas
+        de las de sus estratos.
+        """
+        mask = self.mask(filters)
+        # Un pedido sin importe suma 0, como en las sumas exactas de pandas.
+        y = np.where(mask, np.nan_to_num(self.rows[measure].to_numpy(dtype=float)), 0.0)
+        n, population = self.taken, self.population
+        s1 = np.bincount(self.stratum, weights=y, minlength=len(n))
+        s2 = np.bincount(self.stratum, weights=y * y, minlength=len(n))
+        mean = s1 / n
+        variance = np.where(n > 1, (s2 - n * mean**2) / np.maximum(n - 1, 1), 0.0).clip(min=0)
+        # Varianza del total del estrato, con corrección por población finita.
+        total_variance = population**2 * (1 - n / population) * variance / n
+        matched = np.bincount(self.stratum, weights=mask, minlength=len(n))
+        strata = pd.DataFrame(
+            {by: self.strata[by], measure: population * mean, "variance": total_variance, "matched": matched}
+        )
+        groups = strata.groupby(by, observed=True, sort=True)[[measure, "variance", "matched"]].sum()
+        groups = groups[groups["matched"] > 0]
+        return pd.DataFrame(
+            {by: groups.index, measure: groups[measure].to_numpy(), "ci": Z_95 * np.sqrt(groups["variance"].to_numpy())}
+        )
+
+    def points(self, filters, window=None):
+        """Costo, ganancia y peso de las filas de la muestra que cumplen los filtros."""
+        mask = self.mask(filters, window)
+        return self.rows["cost"].to_numpy()[mask], self.rows["profit"].to_numpy()[mask], self.weight[mask]
@@ -0,0 +1,105 @@
+// Callbacks del navegador. Los de las figuras son los del modo
+// TIENDAEUR_CLIENTSIDE=1: construyen las mismas figuras que pages/dashboard.py
+// a partir del store "aggregates", sin ninguna petición al servidor.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    tiendaeur: {
+        markTabSeen: function (activeTab, seenTabs) {
+            if (!activeTab || seenTabs.includes(activeTab)) {
+                return window.dash_clientside.no_update;
+            }
+            return seenTabs.concat([activeTab]);
+        },
+
+        expandColumns: function (columns) {
+            // {columna: valores} -> filas para la DataTable.
+            if (!columns) {
+                return window.dash_clientside.no_update;
+            }
+            const names = Object.keys(columns);
+            const length = names.length ? columns[names[0]].length : 0;
+            const records = new Array(length);
+            for (let i = 0; i < length; i++) {
+                const record = {};
+                for (const name of names) {
+                    record[name] = columns[name][i];
+                }
+                records[i] = record;
+            }
+            return records;
+        },
+
+        costDatetimeWidth: function (seenTabs) {
+            // Una pestaña oculta mide 0: se espera a que se muestre.
+            const graph = document.getElementById("cost_datetime");
+            if (!graph || !graph.offsetWidth) {
+                return window.dash_clientside.no_update;
+            }
+            return graph.offsetWidth;
+        },
+
+        profitByCountry: function (deviceType, aggregates) {
+            if (!aggregates) {
+                return window.dash_clientside.no_update;
+            }
+            const view = aggregates.profit_by_country[deviceType] || {x: [], y: []};
+            return {
+                data: [{
+                    type: "bar",
+                    x: view.x,
+                    y: view.y,
+                    marker: {color: aggregates.primary_color},
+                }],
+                layout: {
+                    xaxis: {title: {text: "country"}},
+                    yaxis: {title: {text: "profit"}},
+                },
+            };
+        },
+
+        costByDevice: function (category, aggregates) {
+            if (!aggregates) {
+                return window.dash_clientside.no_update;
+            }
+            const view = aggregates.cost_by_device[category] || {x: [], y: []};
+            return {
+                data: [{
+                    type: "pie",
+                    labels: view.x,
+                    values: view.y,
+                    marker: {colors: aggregates.pie_colors},
+                }],
+                layout: {},
+            };
+        },
+
+        timeCost: function (selectedDay, period, aggregates) {
+            if (!aggregates) {
+                return window.dash_clientside.no_update;
+            }
+            const series = aggregates.periods[period];
+            const layout = {
+                title: {x: 0.5, xanchor: "center"},
+                xaxis: {showgrid: false, zeroline: false, title: {text: "Fecha"}},
+                yaxis: {showgrid: false, zeroline: false, title: {text: "Costo"}},
+            };
+            if (period === "All" && series.x.length) {
+                const day = Math.min(Math.max(selectedDay, 0), series.x.length - 1);
+                const low = aggregates.cost_min[day];
+                const high = aggregates.cost_max[day];
+                const padding = (high - low) * 0.05 || 1;
+                layout.xaxis.range = [series.x[0], series.x[day]];
+                layout.yaxis.range = [low - padding, high + padding];
+            }
+            return {
+                data: [{
+                    type: "scatter",
+                    mode: "lines",
+                    x: series.x,
+                    y: series.y,
+                    line: {color: aggregates.primary_color},
+                }],
+                layout: layout,
+            };
+        },
+    },
+});
@@ -0,0 +1,419 @@
+# Benchmark reproducible de los callbacks del dashboard con datos sintéticos.
+#
+#   python benchmark.py                      # 10k, 1M y 10M filas
+#   python benchmark.py --rows 10000 --env TIENDAEUR_FIGURE_CACHE_MB=0
+#
+# Para cada tamaño se genera un CSV con la forma del de TiendaEUR y se lanza
+# la app dos veces en un subproceso: la primera construye la instantánea
+# (arranque en frío) y la segunda mide el arranque en caliente y la latencia
+# de cada callback, llamándolo directamente y a través del cliente de pruebas
+# de Flask con peticiones `_dash-update-component`.
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "bench")
+DEFAULT_ROWS = [10_000, 1_000_000, 10_000_000]
+# Como un navegador: los bytes medidos son los que viajan por la red.
+WIRE_HEADERS = {"Accept-Encoding": "br, gzip"}
+# Intervalo de consulta de los background callbacks: mucho menor que el del
+# navegador (POLL_MS) para medir cuándo termina el trabajo.
+BACKGROUND_POLL_S = 0.005
+
+COUNTRIES = [
+    "Spain", "France", "Germany", "Italy", "Portugal", "Netherlands", "Belgium", "Austria",
+    "Ireland", "Poland", "Sweden", "Denmark", "Finland", "Greece", "Czechia", "Hungary",
+]
+CATEGORIES = ["Electronics", "Home", "Fashion", "Sports", "Books", "Toys", "Beauty", "Garden"]
+DEVICES = ["PC", "Mobile", "Tablet"]
+
+
+def generate(rows, path, seed=0, chunk_size=1_000_000):
+    """Escribe `rows` pedidos sintéticos con las columnas y formatos del CSV real."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2020-01-01")
+    days = np.sort(rng.integers(0, 3 * 365, rows))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        for offset in range(0, rows, chunk_size):
+            n = min(chunk_size, rows - offset)
+            dates = pd.to_datetime(start + days[offset : offset + n])
+            cost = np.round(rng.uniform(5, 1500, n), 2)
+            value = np.round(cost * rng.uniform(0.7, 2.5, n), 2)
+            chunk = pd.DataFrame(
+                {
+                    "date": dates.strftime("%m/%d/%Y"),
+                    "country": np.asarray(COUNTRIES)[rng.integers(0, len(COUNTRIES), n)],
+                    "category": np.asarray(CATEGORIES)[rng.integers(0, len(CATEGORIES), n)],
+                    "device_type": np.asarray(DEVICES)[rng.integers(0, len(DEVICES), n)],
+                    "cost": cost,
+                    # El CSV publicado usa separador de miles en order_value_EUR.
+                    "order_value_EUR": [f"{v:,.2f}" for v in value],
+                }
+            )
+            chunk.to_csv(f, header=offset == 0, index=False)
+    os.replace(tmp, path)
+
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) * 1000 if samples else float("nan")
+
+
+def _time_calls(func, cases, repeat):
+    timings = []
+    for _ in range(repeat):
+        for case in cases:
+            start = time.perf_counter()
+            func(*case)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _update_request(output, inputs, changed, state=()):
+    outputs = [{"id": o.split(".")[0], "property": o.split(".")[1]} for o in output.split("...")]
+    return {
+        "output": output if len(outputs) == 1 else f"..{output}..",
+        "outputs": outputs[0] if len(outputs) == 1 else outputs,
+        "inputs": [{"id": i, "property": p, "value": v} for (i, p), v in inputs],
+        "changedPropIds": [changed],
+        "state": [{"id": i, "property": p, "value": v} for (i, p), v in state],
+    }
+
+
+def _pending_job(response):
+    # Respuesta de un background callback sin resultado todavía: JSON sin
+    # "response" (el despacho trae además cacheKey y job). Son respuestas
+    # pequeñas, nunca comprimidas.
+    if response.status_code != 200 or response.headers.get("Content-Encoding"):
+        return False
+    return "response" not in response.get_json()
+
+
+def _post_update(client, body):
+    """POST a `_dash-update-component` como el navegador.
+
+    Un background callback (TIENDAEUR_BACKGROUND=1) responde primero con su
+    trabajo; se consulta hasta que llega el resultado, así el tiempo medido
+    incluye el cálculo y no solo el despacho.
+    """
+    response = client.post("/_dash-update-component", json=body, headers=WIRE_HEADERS)
+    if not _pending_job(response):
+        return response
+    job = response.get_json()
+    while _pending_job(response):
+        time.sleep(BACKGROUND_POLL_S)
+        response = client.post(
+            "/_dash-update-component",
+            query_string={"cacheKey": job["cacheKey"], "job": job["job"]},
+            json=body,
+            headers=WIRE_HEADERS,
+        )
+    return response
+
+
+def _figure_output(page, chart):
+    # En modo aproximado (TIENDAEUR_APPROX=1) la gráfica escribe también `<gráfica>_exact`.
+    return "...".join([f"{chart}.figure"] + [f"{chart}_exact.data"] * (chart in page.PROGRESSIVE_CHARTS))
+
+
+def run_worker(repeat):
+    # Se ejecuta en el subproceso, con TIENDAEUR_SOURCE apuntando al CSV sintético.
+    start = time.perf_counter()
+    import app
+    from pages import dashboard
+
+    startup = time.perf_counter() - start
+    state = dashboard.store.state
+    countries = list(state.countries)
+    categories = list(state.categories)
+    last_day = len(state.daily) - 1
+    empty = dashboard.EMPTY_FILTERS
+    by_device = [empty] + [dict(empty, device_type=[d]) for d in DEVICES]
+    by_category = [empty] + [dict(empty, category=[c]) for c in categories]
+    by_country = [empty, dict(empty, country=countries[:1]), dict(empty, country=countries[:3])]
+    # Filtros cruzados que no resuelven las vistas precalculadas del cubo.
+    crossed = [
+        dict(empty, category=categories[:1], country=countries[:3]),
+        dict(empty, device_type=DEVICES[:1], date=[str(state.rollups.labels[0]), str(state.rollups.labels[last_day // 2])]),
+    ]
+
+    direct = {
+        "update_profit_country": (dashboard.update_profit_country, [(f,) for f in by_device]),
+        "update_cost_device": (dashboard.update_cost_device, [(f,) for f in by_category]),
+        "crossfilter_views": (
+            lambda f: (
+                dashboard.update_profit_country(f),
+                dashboard.update_cost_device(f),
+                dashboard.scatter_view(f, None),
+            ),
+            [(f,) for f in crossed],
+        ),
+        "scatter_view": (dashboard.scatter_view, [(f, None) for f in by_country]),
+        "approximate_views": (
+            lambda f: (
+                dashboard.approximate_profit_country(f),
+                dashboard.approximate_cost_device(f),
+                dashboard.approximate_scatter_view(f, None),
+            ),
+            [(f,) for f in crossed],
+        ),
+        "time_cost_view": (dashboard.time_cost_view, [(p,) for p in ["All", "Year", "Quarter", "Month", "Week"]]),
+        "table_page": (
+            state.table.page,
+            [
+                (0, 10, [], ""),
+                (5, 10, [{"column_id": "cost", "direction": "desc"}], ""),
+                (0, 10, [], "{device_type} = PC"),
+            ],
+        ),
+    }
+    # Todas las pestañas abiertas: los callbacks aplazados calculan siempre.
+    seen = (("seen_tabs", "data"), ["summary", "analysis", "data"])
+    charts = list(dashboard.CHART_DIMENSIONS)
+    controls = [(("filter_device", "value"), "All"), (("filter_category", "value"), "All"), (("select", "value"), None)]
+    filter_stores = [(("filters", "data"), empty)] + [((f"{chart}_filters", "data"), empty) for chart in charts]
+    # Contenido de una página: lo devuelve el callback de rutas de Dash.
+    pages = [
+        _update_request(
+            "_pages_content.children..._pages_store.data",
+            [(("_pages_location", "pathname"), path), (("_pages_location", "search"), "")],
+            "_pages_location.pathname",
+        )
+        for path in ("/", "/resumen")
+    ]
+    http = {
+        "pages": pages,
+        # Clic en una barra de "Ganancias por país".
+        "dispatch_filters": [
+            _update_request(
+                "...".join(["selections.data", "filters.data"] + [f"{chart}_filters.data" for chart in charts]),
+                controls
+                + [
+                    (event, {"points": [{"x": country}]} if event == ("profit_country", "clickData") else None)
+                    for event in dashboard.SELECTION_EVENTS
+                ],
+                "profit_country.clickData",
+                [(("filter_period", "value"), "All"), (("selections", "data"), {})] + filter_stores,
+            )
+            for country in countries[:3]
+        ],
+        "profit_country": [
+            _update_request(
+                _figure_output(dashboard, "profit_country"),
+                [seen, (("profit_country_filters", "data"), f), (("data_version", "data"), dashboard.store.version)],
+                "profit_country_filters.data",
+            )
+            for f in by_device
+        ],
+        "cost_device": [
+            _update_request(
+                _figure_output(dashboard, "cost_device"),
+                [seen, (("cost_device_filters", "data"), f), (("data_version", "data"), dashboard.store.version)],
+                "cost_device_filters.data",
+            )
+            for f in by_category
+        ],
+        "profit_vs_cost": [
+            _update_request(
+                _figure_output(dashboard, "profit_vs_cost"),
+                [
+                    seen,
+                    (("profit_vs_cost_filters", "data"), f),
+                    (("profit_vs_cost", "relayoutData"), None),
+                    (("data_version", "data"), dashboard.store.version),
+                ],
+                "profit_vs_cost_filters.data",
+            )
+            for f in by_country
+        ],
+        # Página "Resumen": mismas figuras (y entradas de caché) que la principal.
+        "resumen_profit_country": [
+            _update_request(
+                "resumen_profit_country.figure",
+                [(("resumen_filter_device", "value"), device_type)],
+                "resumen_filter_device.value",
+            )
+            for device_type in ["All"] + DEVICES
+        ],
+        "cost_datetime": [
+            _update_request(
+                "cost_datetime.figure",
+                [
+                    seen,
+                    (("date-slider", "value"), day),
+                    (("filter_period", "value"), period),
+                    (("cost_datetime_filters", "data"), empty),
+                    (("data_version", "data"), dashboard.store.version),
+                    (("cost_datetime", "relayoutData"), None),
+                    (("cost_datetime_width", "data"), None),
+                ],
+                changed,
+            )
+            for day, period, changed in [
+                (last_day, "All", "filter_period.value"),
+                (last_day // 2, "All", "date-slider.value"),
+                (last_day, "Year", "filter_period.value"),
+                (last_day, "Month", "filter_period.value"),
+            ]
+        ],
+        "orders_table": [
+            _update_request(
+                ("orders_page" if dashboard.COMPACT else "orders_table") + ".data...orders_table.page_count",
+                [
+                    seen,
+                    (("orders_table", "page_current"), page),
+                    (("orders_table", "page_size"), 10),
+                    (("orders_table", "sort_by"), sort_by),
+                    (("orders_table", "filter_query"), query),
+                    (("data_version", "data"), dashboard.store.version),
+                ],
+                "orders_table.page_current",
+            )
+            for page, sort_by, query in [
+                (0, [], ""),
+                (5, [{"column_id": "cost", "direction": "desc"}], ""),
+                (0, [], "{device_type} = PC"),
+            ]
+        ],
+    }
+
+    results = {"startup_s": startup, "rows": len(state.df), "callbacks": {}, "skipped": []}
+    for name, (func, cases) in direct.items():
+        first = _time_calls(func, cases, 1)
+        timings = _time_calls(func, cases, repeat)
+        results["callbacks"][f"direct:{name}"] = {
+            "cold_ms": percentile(first, 50),
+            "p50_ms": percentile(timings, 50),
+            "p99_ms": percentile(timings, 99),
+        }
+
+    client = app.server.test_client()
+    client.get("/_dash-layout")
+    # Solo los callbacks del servidor: con TIENDAEUR_CLIENTSIDE=1 algunas
+    # gráficas se calculan en el navegador y no hay petición que medir.
+    server_outputs = {
+        dependency["output"]
+        for dependency in client.get("/_dash-dependencies").get_json()
+        if not dependency.get("clientside_function")
+    }
+    for name, bodies in http.items():
+        if any(body["output"] not in server_outputs for body in bodies):
+            results["skipped"].append(f"http:{name}")
+            continue
+        timings, sizes = [], []
+        for _ in range(repeat):
+            for body in bodies:
+                start = time.perf_counter()
+                response = _post_update(client, body)
+                timings.append(time.perf_counter() - start)
+                if response.status_code not in (200, 204):
+                    raise RuntimeError(f"{name}: HTTP {response.status_code} {response.data[:200]!r}")
+                sizes.append(len(response.data))
+        results["callbacks"][f"http:{name}"] = {
+            "p50_ms": percentile(timings, 50),
+            "p99_ms": percentile(timings, 99),
+            "bytes": int(np.median(sizes)),
+        }
+    # /metrics tiene que seguir sirviéndose con las fases medidas al arrancar
+    # (fuera de cualquier callback) y las de los callbacks.
+    metrics = client.get("/metrics")
+    if metrics.status_code != 200:
+        raise RuntimeError(f"/metrics: HTTP {metrics.status_code} {metrics.data[:200]!r}")
+    # Lo que necesita el navegador para pintar la página principal: el layout
+    # pedido desde "/" ya trae la página con sus figuras. Las visitas
+    # siguientes solo revalidan con el ETag (304 sin cuerpo).
+    page_headers = dict(WIRE_HEADERS, Referer="http://localhost/")
+    layout = client.get("/_dash-layout", headers=page_headers)
+    revalidate_headers = dict(page_headers, **{"If-None-Match": layout.headers["ETag"]})
+    for name, headers in (("layout", page_headers), ("layout_304", revalidate_headers)):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get("/_dash-layout", headers=headers)
+            timings.append(time.perf_counter() - start)
+        results["callbacks"][f"http:{name}"] = {
+            "p50_ms": percentile(timings, 50),
+            "p99_ms": percentile(timings, 99),
+            "bytes": len(response.data),
+        }
+    results["layout_bytes"] = len(layout.data)
+    # ru_maxrss está en KiB en Linux.
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(results))
+
+
+def run_case(rows, repeat, extra_env):
+    csv_path = os.path.join(BENCH_DIR, f"orders-{rows}.csv")
+    if not os.path.exists(csv_path):
+        print(f"Generando {rows:,} pedidos en {csv_path}...", file=sys.stderr)
+        generate(rows, csv_path)
+    cache_dir = os.path.join(BENCH_DIR, f"cache-{rows}")
+    env = dict(
+        os.environ,
+        TIENDAEUR_SOURCE=csv_path,
+        TIENDAEUR_CACHE_DIR=cache_dir,
+        TIENDAEUR_REFRESH_SECONDS="0",
+        **extra_env,
+    )
+    # Arranque en frío: sin instantánea previa.
+    for name in ("tiendaeur.parquet", "tiendaeur.json"):
+        path = os.path.join(cache_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--repeat", str(repeat)]
+    runs = []
+    for _ in range(2):
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    result = runs[1]
+    result["startup_cold_s"] = runs[0]["startup_s"]
+    return result
+
+
+def report(results):
+    for result in results:
+        print(
+            f"\n== {result['rows']:,} filas  arranque frío {result['startup_cold_s']:.2f}s  "
+            f"caliente {result['startup_s']:.2f}s  RSS pico {result['peak_rss_mb']:.0f} MB  "
+            f"layout {result['layout_bytes']:,} B"
+        )
+        print(f"{'callback':<32}{'frío ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'bytes':>12}")
+        for name, stats in result["callbacks"].items():
+            cold = f"{stats['cold_ms']:.2f}" if "cold_ms" in stats else "-"
+            size = f"{stats['bytes']:,}" if "bytes" in stats else "-"
+            print(f"{name:<32}{cold:>10}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}{size:>12}")
+        if result["skipped"]:
+            print(f"sin callback en el servidor (clientside): {', '.join(result['skipped'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los callbacks de TiendaEUR con datos sintéticos.")
+    parser.add_argument("--rows", default=",".join(map(str, DEFAULT_ROWS)), help="tamaños separados por comas")
+    parser.add_argument("--repeat", type=int, default=20, help="repeticiones de cada caso")
+    parser.add_argument("--env", action="append", default=[], help="VAR=valor para el subproceso (modos a comparar)")
+    parser.add_argument("--json", help="guarda los resultados en este fichero")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.repeat)
+        return
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    results = [run_case(int(rows), args.repeat, extra_env) for rows in args.rows.split(",")]
+    report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
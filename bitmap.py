@@ -0,0 +1,40 @@
+# Índice de mapas de bits para los filtros por device_type, category y country.
+#
+# Para cada valor distinto de cada columna se guarda un bitset empaquetado
+# (1 bit por pedido). Una combinación de filtros se resuelve con OR dentro de
+# una columna (`bitmap`) y AND entre columnas (CrossFilter._bits, junto con
+# las fechas) sobre arrays de n/8 bytes, sin volver a mirar las columnas de
+# texto.
+import numpy as np
+import pandas as pd
+
+INDEXED_COLUMNS = ("device_type", "category", "country")
+
+# Número de bits a 1 de cada byte, para contar filas sin desempaquetar.
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class BitmapIndex:
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.size = len(df)
+        self.columns = tuple(columns)
+        self._bitmaps = {}
+        for column in columns:
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, categories = pd.factorize(values)
+            self._bitmaps[column] = {
+                category: np.packbits(codes == code) for code, category in enumerate(categories)
+            }
+        self._empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def bitmap(self, column, values):
+        # OR de los bitsets de los valores pedidos; los desconocidos no suman.
+        bitmaps = [self._bitmaps[column][value] for value in values if value in self._bitmaps[column]]
+        if not bitmaps:
+            return self._empty
+        if len(bitmaps) == 1:
+            return bitmaps[0]
+        return np.bitwise_or.reduce(bitmaps)
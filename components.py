@@ -0,0 +1,111 @@
+# Estilos y piezas del layout comunes a todas las páginas (ver pages/).
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import dash_bootstrap_components as dbc
+from dash import dcc, html
+
+# Configuración de estilos.
+colors = {"bg": "#333333", "text": "#ffffff"}
+primary_color = "#A1343C"
+graph_style = {
+    "border": "2px solid #ffffff",
+    "borderRadius": "15px",
+    "margin-bottom": "16px",
+}
+
+# Los layouts de las páginas traen las figuras y los KPI ya calculados salvo
+# dentro de `skeleton()`: el validation_layout de Dash (que viaja en la
+# configuración de cada carga de la página) solo necesita los ids.
+_prerender = ContextVar("prerender", default=True)
+
+
+def prerender():
+    return _prerender.get()
+
+
+@contextmanager
+def skeleton():
+    token = _prerender.set(False)
+    try:
+        yield
+    finally:
+        _prerender.reset(token)
+
+
+def category_options(state):
+    return [
+        {"label": category, "value": category} for category in state.categories
+    ]
+
+
+def country_options(state):
+    return [
+        {"label": country, "value": country} for country in state.countries
+    ]
+
+
+def title_row(title, size=html.H2):
+    return dbc.Row(
+        dbc.Col(
+            size(title),
+            style={
+                "textAlign": "center",
+                "fontFamily": "Segoe UI",
+                "color": colors["text"],
+            },
+        ),
+        justify="center",
+        align="center",
+    )
+
+
+def summary_filters(state, device_id="filter_device", category_id="filter_category"):
+    # Dispositivo y categoría de la pestaña "Resumen".
+    return dbc.Row(
+        justify="center",
+        align="center",
+        children=[
+            dbc.Col(
+                dbc.RadioItems(
+                    id=device_id,
+                    className="btn-group",
+                    inputClassName="btn-check",
+                    labelClassName="btn btn-light",
+                    labelCheckedClassName="active",
+                    options=[
+                        {"label": "Todos", "value": "All"},
+                        {"label": "PC", "value": "PC"},
+                        {"label": "Móviles", "value": "Mobile"},
+                        {"label": "Tabletas", "value": "Tablet"},
+                    ],
+                    value="All",
+                ),
+            ),
+            dbc.Col(
+                dcc.Dropdown(
+                    id=category_id,
+                    options=[{"label": "Todos", "value": "All"}] + category_options(state),
+                    value="All",
+                    clearable=False,
+                    style={
+                        "backgroundColor": "white",
+                        "color": "black",
+                    },
+                ),
+            ),
+        ],
+        className="radio-group",
+    )
+
+
+def graph_column(title, graph_id, *children, figure=None):
+    # Título, gráfica (vacía o ya calculada) y lo que vaya debajo (barra de
+    # progreso, controles).
+    return dbc.Col(
+        children=[
+            title_row(title),
+            dcc.Graph(figure=figure or {}, id=graph_id, style=graph_style),
+            *children,
+        ]
+    )
@@ -0,0 +1,216 @@
+# Filtrado cruzado entre las gráficas del dashboard.
+#
+# El estado de filtros une los controles (dispositivo, categoría, países) con
+# lo seleccionado en las gráficas: barras de "Ganancias por país", porción de
+# "Costos según dispositivo", tramo de "Costos en el tiempo" y zona de
+# "Ganancia según el costo". En cada dimensión el control y la selección se
+# combinan con AND.
+#
+# Una gráfica no se filtra por su propia dimensión (la barra elegida no
+# desaparece de su gráfico), así que cada una recibe los filtros sin ella y
+# solo se recalcula cuando cambian los demás (ver `dispatch_filters` en
+# pages/dashboard.py). `CrossFilter` guarda las máscaras de cada dimensión
+# de un estado de los datos; todas las gráficas y los KPI las comparten.
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from bitmap import INDEXED_COLUMNS, POPCOUNT
+from rollups import TimeRollups
+
+# Dimensiones del estado de filtros. Las de texto son listas de valores
+# permitidos, "date" es [inicio, fin] y "window" [[costo], [ganancia]].
+DIMENSIONS = ("device_type", "category", "country", "date", "window")
+# Dimensiones cuyo valor es un rango: el orden de la lista importa.
+RANGE_DIMENSIONS = ("date", "window")
+EMPTY_FILTERS = dict.fromkeys(DIMENSIONS)
+
+# Gráfica -> dimensión que selecciona (y que no la filtra).
+CHART_DIMENSIONS = {
+    "profit_country": "country",
+    "cost_device": "device_type",
+    "cost_datetime": "date",
+    "profit_vs_cost": "window",
+}
+
+ROW_COLUMNS = ["device_type", "category", "country", "date", "profit", "cost"]
+
+
+def as_values(selected):
+    # Valor de un control -> lista ordenada de valores, o None si no filtra.
+    if selected is None or selected == "All":
+        return None
+    values = [selected] if isinstance(selected, str) else list(selected)
+    return sorted(values) or None
+
+
+def clicked(click_data, key, previous):
+    """Valor del punto pulsado; pulsar otra vez el mismo punto lo deselecciona."""
+    if not click_data or not click_data.get("points"):
+        return None
+    values = [click_data["points"][0][key]]
+    return None if values == previous else values
+
+
+def selected_values(selected_data, key):
+    if not selected_data or not selected_data.get("points"):
+        return None
+    return sorted({point[key] for point in selected_data["points"]})
+
+
+def selected_box(selected_data):
+    # [[x0, x1], [y0, y1]] de una selección rectangular o de lazo.
+    if not selected_data:
+        return None
+    if "range" in selected_data:
+        x, y = selected_data["range"]["x"], selected_data["range"]["y"]
+    elif "lassoPoints" in selected_data:
+        x, y = selected_data["lassoPoints"]["x"], selected_data["lassoPoints"]["y"]
+    else:
+        return None
+    return [[min(x), max(x)], [min(y), max(y)]]
+
+
+def combine(controls, selections):
+    """Estado de filtros a partir de los controles y las selecciones por gráfica."""
+    filters = dict(EMPTY_FILTERS)
+    for dimension, selected in controls.items():
+        filters[dimension] = as_values(selected)
+    for chart, selection in selections.items():
+        if selection is None:
+            continue
+        dimension = CHART_DIMENSIONS[chart]
+        current = filters[dimension]
+        if current is None or dimension in RANGE_DIMENSIONS:
+            filters[dimension] = selection
+        else:
+            filters[dimension] = [value for value in current if value in selection]
+    return filters
+
+
+def for_chart(filters, chart):
+    return dict(filters, **{CHART_DIMENSIONS[chart]: None})
+
+
+def active_filters(filters):
+    return {dimension: value for dimension, value in (filters or {}).items() if value is not None}
+
+
+def view_key(filters, dimension):
+    """Clave de la vista del cubo precalculada por `dimension` ("All" o un
+    valor) si los filtros no piden otra cosa; None si hay que filtrar celdas."""
+    active = active_filters(filters)
+    if not active:
+        return "All"
+    values = active.get(dimension)
+    if len(active) == 1 and values is not None and len(values) == 1:
+        return values[0]
+    return None
+
+
+def _freeze(filters):
+    def freeze(value):
+        return tuple(freeze(v) for v in value) if isinstance(value, list) else value
+
+    return tuple((dimension, freeze(value)) for dimension, value in active_filters(filters).items())
+
+
+def date_bounds(dates):
+    start, end = dates
+    return pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+
+
+class CrossFilter:
+    """Vista filtrada de un DataState para cualquier combinación de filtros."""
+
+    def __init__(self, state):
+        self.state = state
+        self._cell_mask = lru_cache(maxsize=64)(self._compute_cell_mask)
+        self._row_dates = lru_cache(maxsize=8)(self._compute_row_dates)
+        self._rollups = lru_cache(maxsize=16)(self._compute_rollups)
+
+    def _compute_cell_mask(self, dimension, values):
+        cells = self.state.cube.cells
+        if dimension == "date":
+            start, end = date_bounds(values)
+            return ((cells["date"] >= start) & (cells["date"] < end)).to_numpy()
+        return cells[dimension].isin(values).to_numpy()
+
+    def _compute_row_dates(self, dates):
+        start, end = date_bounds(dates)
+        column = self.state.df["date"]
+        return np.packbits(((column >= start) & (column < end)).to_numpy())
+
+    def cells(self, filters):
+        """Celdas del cubo que cumplen `filters`. Con una zona del scatter
+        seleccionada hay que mirar cada pedido: se devuelven los pedidos con
+        las mismas columnas que las celdas."""
+        if filters.get("window") is not None:
+            return self._rows(filters)
+        cells = self.state.cube.cells
+        mask = None
+        for dimension, values in active_filters(filters).items():
+            part = self._cell_mask(dimension, tuple(values))
+            mask = part if mask is None else mask & part
+        return cells if mask is None else cells[mask]
+
+    def _bits(self, filters):
+        # Bitset de los pedidos por dispositivo, categoría, país y fechas.
+        bitmaps = self.state.bitmaps
+        bits = None
+        for column in INDEXED_COLUMNS:
+            values = filters.get(column)
+            if values is not None:
+                part = bitmaps.bitmap(column, values)
+                bits = part if bits is None else np.bitwise_and(bits, part)
+        if filters.get("date") is not None:
+            part = self._row_dates(tuple(filters["date"]))
+            bits = part if bits is None else np.bitwise_and(bits, part)
+        return bits
+
+    def positions(self, filters):
+        """Posiciones de los pedidos que cumplen `filters`, o None si todos."""
+        bits = self._bits(filters)
+        positions = None if bits is None else np.flatnonzero(np.unpackbits(bits, count=self.state.bitmaps.size))
+        if filters.get("window") is not None:
+            df = self.state.df
+            (x0, x1), (y0, y1) = filters["window"]
+            cost = df["cost"].to_numpy()
+            profit = df["profit"].to_numpy()
+            if positions is not None:
+                cost, profit = cost[positions], profit[positions]
+            keep = np.flatnonzero((cost >= x0) & (cost <= x1) & (profit >= y0) & (profit <= y1))
+            positions = keep if positions is None else positions[keep]
+        return positions
+
+    def count(self, filters):
+        if filters.get("window") is not None:
+            return len(self.positions(filters))
+        bits = self._bits(filters)
+        if bits is None:
+            return self.state.bitmaps.size
+        return int(POPCOUNT[bits].sum(dtype=np.int64))
+
+    def _rows(self, filters):
+        positions = self.positions(filters)
+        rows = self.state.df[ROW_COLUMNS].iloc[positions]
+        return rows.assign(date=rows["date"].dt.normalize(), orders=1)
+
+    def rollups(self, filters):
+        """Agregados temporales de los pedidos filtrados, sobre los mismos días
+        que los del dataset completo (así el slider apunta al mismo día)."""
+        if not active_filters(filters):
+            return self.state.rollups
+        return self._rollups(_freeze(filters))
+
+    def _compute_rollups(self, frozen):
+        cells = self.cells(dict(frozen))
+        daily = (
+            cells.groupby("date")[["cost", "profit"]]
+            .sum()
+            .reindex(self.state.daily["date"], fill_value=0)
+            .rename_axis("date")
+            .reset_index()
+        )
+        return TimeRollups(daily)
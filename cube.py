@@ -0,0 +1,67 @@
+# Cubo pre-agregado device_type × category × country × día.
+#
+# Se construye una sola vez al cargar los datos; los callbacks consultan las
+# vistas derivadas (diccionarios por valor del filtro) en lugar de filtrar y
+# re-agregar las filas de pedidos en cada interacción.
+import pandas as pd
+
+DIMENSIONS = ["device_type", "category", "country", "date"]
+MEASURES = ["profit", "cost", "orders"]
+
+
+def build_cells(df):
+    return (
+        df.assign(date=df["date"].dt.normalize())
+        .groupby(DIMENSIONS, dropna=False, observed=True, sort=True)
+        .agg(profit=("profit", "sum"), cost=("cost", "sum"), orders=("profit", "size"))
+        .reset_index()
+    )
+
+
+def _rollup(cells, filter_column, keys, measure):
+    # {"All": total, valor_del_filtro: subtotal, ...} con `keys` como columnas.
+    views = {"All": cells.groupby(keys, dropna=False, observed=True)[measure].sum().reset_index()}
+    grouped = cells.groupby([filter_column] + keys, dropna=False, observed=True)[measure].sum()
+    for value, frame in grouped.groupby(level=0, dropna=False, observed=True):
+        views[value] = frame.droplevel(0).reset_index()
+    return views
+
+
+class Cube:
+    def __init__(self, df=None, cells=None):
+        self.cells = build_cells(df) if cells is None else cells
+        self._profit_by_country = _rollup(self.cells, "device_type", ["country"], "profit")
+        self._cost_by_device = _rollup(self.cells, "category", ["device_type"], "cost")
+        self._daily = self.cells.groupby("date", observed=True)[["cost", "profit"]].sum().reset_index()
+
+    def profit_by_country(self, device_type="All"):
+        return self._profit_by_country.get(device_type, self._profit_by_country["All"].iloc[0:0])
+
+    def cost_by_device(self, category="All"):
+        return self._cost_by_device.get(category, self._cost_by_device["All"].iloc[0:0])
+
+    def daily(self):
+        return self._daily
+
+    def appended(self, df):
+        # Nuevo cubo con los pedidos de `df` sumados a las celdas existentes.
+        cells = (
+            pd.concat([self.cells, build_cells(df)], ignore_index=True)
+            .groupby(DIMENSIONS, dropna=False, observed=True, sort=True)[MEASURES]
+            .sum()
+            .reset_index()
+        )
+        return Cube(cells=cells)
+
+    def to_client(self):
+        # Vistas por filtro en formato JSON para los callbacks del navegador.
+        return {
+            "profit_by_country": {
+                str(key): {"x": view["country"].tolist(), "y": view["profit"].tolist()}
+                for key, view in self._profit_by_country.items()
+            },
+            "cost_by_device": {
+                str(key): {"x": view["device_type"].tolist(), "y": view["cost"].tolist()}
+                for key, view in self._cost_by_device.items()
+            },
+        }
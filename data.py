@@ -0,0 +1,390 @@
+# Carga del dataset TiendaEUR con caché local en formato columnar (Parquet).
+#
+# La primera vez (o cuando la instantánea caduca) se lee la fuente remota o un
+# fichero local, se limpia y se guarda en `.cache/` junto a un fichero de
+# metadatos con el hash del contenido. El resto de arranques, y todos los
+# workers de gunicorn, leen la instantánea con memory-map sin tocar la red.
+#
+# El CSV se procesa en streaming: el lector de pyarrow lo parsea por bloques
+# en varios hilos con los tipos de COLUMN_TYPES (fechas incluidas), cada
+# bloque se limpia y se escribe como un row group de la instantánea. La
+# memoria usada depende del tamaño de bloque, no del fichero.
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+DATA_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vR39zCK50jRbeuJonUUGCWGa5t1psOH98nuZrZpZtVUtS8j_EFGg2WwqlTZmSlkjmGI6wK_HIIqKsR3/pub?gid=789094753&single=true&output=csv"
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tiendaeur_sample.csv")
+
+# Configuración por variables de entorno. TIENDAEUR_SOURCE acepta una URL o una
+# ruta local (por ejemplo FIXTURE_PATH para trabajar sin conexión).
+SOURCE = os.environ.get("TIENDAEUR_SOURCE", DATA_URL)
+CACHE_DIR = os.environ.get("TIENDAEUR_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+SNAPSHOT_TTL = float(os.environ.get("TIENDAEUR_SNAPSHOT_TTL", 3600))
+# Con TIENDAEUR_ARROW_DTYPES=1 las columnas no categóricas usan tipos de pandas
+# respaldados por Arrow en lugar de NumPy.
+ARROW_DTYPES = os.environ.get("TIENDAEUR_ARROW_DTYPES") == "1"
+
+# Bloque de CSV que se parsea de una vez (y filas por row group).
+CSV_BLOCK_MB = int(os.environ.get("TIENDAEUR_CSV_BLOCK_MB", 16))
+DOWNLOAD_CHUNK = 1024**2
+
+# Tipos de las columnas de la fuente. El texto de baja cardinalidad se lee
+# como diccionario (categórica en pandas); order_value_EUR llega como texto
+# con separador de miles y se convierte en clean_batch.
+CATEGORY_TYPE = pa.dictionary(pa.int32(), pa.string())
+# El lector de CSV solo produce índices int32; en la instantánea bastan 16 bits.
+SNAPSHOT_CATEGORY_TYPE = pa.dictionary(pa.int16(), pa.string())
+COLUMN_TYPES = {
+    "date": pa.timestamp("us"),
+    "country": CATEGORY_TYPE,
+    "category": CATEGORY_TYPE,
+    "device_type": CATEGORY_TYPE,
+    "cost": pa.float64(),
+    "order_value_EUR": pa.string(),
+}
+DATE_FORMAT = "%m/%d/%Y"
+# Se incrementa cuando cambia el formato de la instantánea para regenerarla.
+SNAPSHOT_FORMAT = 3
+
+SNAPSHOT_NAME = "tiendaeur.parquet"
+META_NAME = "tiendaeur.json"
+# Pedidos añadidos en los refrescos incrementales: un fichero por versión,
+# listado en los metadatos ("deltas"). Pasados MAX_DELTAS se reescribe la
+# instantánea entera y se borran.
+DELTA_NAME = "tiendaeur.delta-{}.parquet"
+MAX_DELTAS = 16
+
+
+def open_source(source):
+    if source.startswith(("http://", "https://")):
+        return urllib.request.urlopen(source, timeout=30)
+    return open(source, "rb")
+
+
+def clean_batch(batch):
+    """Importe numérico y ganancia de un bloque ya tipado."""
+    for index, field in enumerate(batch.schema):
+        if field.type == CATEGORY_TYPE:
+            batch = batch.set_column(index, field.name, batch.column(index).cast(SNAPSHOT_CATEGORY_TYPE))
+    index = batch.schema.get_field_index("order_value_EUR")
+    value = pc.cast(pc.replace_substring(batch.column(index), ",", ""), pa.float64())
+    batch = batch.set_column(index, "order_value_EUR", value)
+    return batch.append_column("profit", pc.subtract(value, batch.column("cost")))
+
+
+def read_csv_batches(source, column_names=None):
+    """Itera los bloques limpios de un CSV (ruta o fichero binario)."""
+    read_options = pacsv.ReadOptions(
+        use_threads=True, block_size=CSV_BLOCK_MB * 1024**2, column_names=column_names
+    )
+    # Una celda vacía es nula también en las columnas de texto: un importe en
+    # blanco llega como NaN en lugar de romper el cast de clean_batch.
+    convert_options = pacsv.ConvertOptions(
+        column_types=COLUMN_TYPES, timestamp_parsers=[DATE_FORMAT], strings_can_be_null=True
+    )
+    with pacsv.open_csv(source, read_options=read_options, convert_options=convert_options) as reader:
+        for batch in reader:
+            yield clean_batch(batch)
+
+
+def read_csv(source, column_names=None, since=None):
+    """DataFrame de un CSV; con `since`, solo los pedidos posteriores a esa
+    fecha, descartados bloque a bloque (el resto nunca llega a pandas)."""
+    batches = read_csv_batches(source, column_names)
+    if since is not None:
+        since = pa.scalar(pd.Timestamp(since).to_datetime64(), COLUMN_TYPES["date"])
+        batches = (batch.filter(pc.greater(batch.column("date"), since)) for batch in batches)
+    batches = [batch for batch in batches if batch.num_rows]
+    if not batches:
+        return None
+    return arrow_to_pandas(pa.Table.from_batches(batches))
+
+
+def align_categories(df, rows):
+    # Hace que las categóricas de `rows` compartan categorías con las de `df`
+    # para que pd.concat conserve el tipo (y los códigos enteros).
+    rows = rows.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and column in rows:
+            new = pd.Index(rows[column].dropna().unique()).difference(df[column].cat.categories)
+            if len(new):
+                df[column] = df[column].cat.add_categories(new)
+            rows[column] = rows[column].astype(df[column].dtype)
+    return df, rows
+
+
+def _arrow_types(arrow_type):
+    # Las columnas diccionario siguen siendo categóricas de pandas.
+    if pa.types.is_dictionary(arrow_type):
+        return None
+    return pd.ArrowDtype(arrow_type)
+
+
+def arrow_to_pandas(table, **kwargs):
+    if ARROW_DTYPES:
+        kwargs["types_mapper"] = _arrow_types
+    df = table.to_pandas(**kwargs)
+    # Cada bloque del CSV trae su propio diccionario: las categorías se dejan
+    # en orden alfabético, como con astype("category").
+    for column in df.select_dtypes("category").columns:
+        categories = df[column].cat.categories
+        df[column] = df[column].cat.reorder_categories(categories.sort_values())
+    return df
+
+
+def memory_report(df):
+    """Memoria del dataset con los tipos compactos frente a texto y int64.
+
+    Sin cargar la versión sin compactar: una columna de texto ocuparía un
+    puntero por fila más el objeto str de cada valor, como mide
+    memory_usage(deep=True).
+    """
+    compact = df.memory_usage(deep=True, index=False)
+    plain = compact.copy()
+    categorical = list(df.select_dtypes("category").columns)
+    for column in categorical:
+        values = df[column].cat
+        counts = np.bincount(values.codes[values.codes >= 0], minlength=len(values.categories))
+        sizes = np.array([sys.getsizeof(str(value)) for value in values.categories])
+        plain[column] = 8 * len(df) + int(counts @ sizes)
+    for column in df.select_dtypes("integer").columns:
+        plain[column] = 8 * len(df)
+    before, after = plain.sum() / 1024**2, compact.sum() / 1024**2
+    return (
+        f"Dataset en memoria: {len(df)} pedidos, {before:.1f} MB como texto -> {after:.1f} MB "
+        f"({1 - after / max(before, 1e-9):.0%} menos). Categóricas: {', '.join(categorical) or 'ninguna'}; "
+        "importes en float64 (con céntimos no caben en float32 sin pérdida)."
+    )
+
+
+def _paths(cache_dir):
+    return os.path.join(cache_dir, SNAPSHOT_NAME), os.path.join(cache_dir, META_NAME)
+
+
+def read_meta(cache_dir=CACHE_DIR):
+    _, meta_path = _paths(cache_dir)
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _snapshot_files(meta, cache_dir):
+    snapshot_path, _ = _paths(cache_dir)
+    return [snapshot_path] + [os.path.join(cache_dir, name) for name in meta.get("deltas", [])]
+
+
+def is_fresh(meta, source=SOURCE, ttl=SNAPSHOT_TTL, cache_dir=CACHE_DIR):
+    if meta is None or meta.get("source") != source or "size" not in meta:
+        return False
+    if not all(os.path.exists(path) for path in _snapshot_files(meta, cache_dir)):
+        return False
+    return time.time() - meta["fetched_at"] < ttl
+
+
+def remove_deltas(cache_dir=CACHE_DIR):
+    # También los que quedaron sin listar si el proceso murió a medias.
+    for path in glob.glob(os.path.join(cache_dir, DELTA_NAME.format("*"))):
+        os.remove(path)
+
+
+def write_snapshot(df, meta, cache_dir=CACHE_DIR):
+    """Reescribe la instantánea entera; los deltas quedan incluidos en ella."""
+    os.makedirs(cache_dir, exist_ok=True)
+    snapshot_path, meta_path = _paths(cache_dir)
+    tmp = snapshot_path + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, snapshot_path)
+    meta = dict(meta, deltas=[])
+    write_json(meta_path, meta)
+    remove_deltas(cache_dir)
+    return meta
+
+
+def append_snapshot(rows, meta, cache_dir=CACHE_DIR):
+    """Guarda solo los pedidos nuevos, en un delta con el esquema de la
+    instantánea, y lo añade a los metadatos. Devuelve los metadatos escritos.
+
+    El nombre sale de la versión: dos procesos que ingieren los mismos pedidos
+    escriben el mismo fichero, no dos copias.
+    """
+    snapshot_path, meta_path = _paths(cache_dir)
+    name = DELTA_NAME.format(meta["hash"][:16])
+    path = os.path.join(cache_dir, name)
+    schema = pq.read_schema(snapshot_path).remove_metadata()
+    table = pa.Table.from_pandas(rows[schema.names], preserve_index=False).cast(schema)
+    pq.write_table(table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    meta = dict(meta, deltas=[*meta.get("deltas", []), name])
+    # Los metadatos se escriben al final: hasta entonces el delta no cuenta.
+    write_json(meta_path, meta)
+    return meta
+
+
+def read_snapshot(meta, cache_dir=CACHE_DIR):
+    files = [pq.ParquetFile(path, memory_map=True) for path in _snapshot_files(meta, cache_dir)]
+    # Columna a columna: el pico es el DataFrame más una columna en Arrow.
+    columns = {}
+    for name in files[0].schema_arrow.names:
+        chunks = pa.chunked_array([chunk for f in files for chunk in f.read(columns=[name]).column(0).chunks])
+        columns[name] = arrow_to_pandas(pa.table({name: chunks}))[name]
+    return pd.DataFrame(columns, copy=False)
+
+
+def copy_stream(f, path):
+    """Copia un fichero abierto a `path` por trozos; devuelve (hash, bytes)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as out:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK), b""):
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def download(source, path):
+    """Copia la fuente a `path` por trozos; devuelve (hash, bytes)."""
+    with open_source(source) as f:
+        return copy_stream(f, path)
+
+
+def write_csv_snapshot(csv_path, cache_dir=CACHE_DIR):
+    """Parsea el CSV bloque a bloque y escribe cada uno como un row group."""
+    snapshot_path, _ = _paths(cache_dir)
+    tmp = snapshot_path + ".tmp"
+    writer = None
+    rows = 0
+    try:
+        for batch in read_csv_batches(csv_path):
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, batch.schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp, snapshot_path)
+    return rows
+
+
+def refresh_snapshot(source=SOURCE, cache_dir=CACHE_DIR):
+    """Descarga la fuente y reescribe la instantánea solo si el contenido cambió."""
+    os.makedirs(cache_dir, exist_ok=True)
+    snapshot_path, meta_path = _paths(cache_dir)
+    # Copia local de la fuente: el hash y el parseo ven exactamente los mismos bytes.
+    csv_path = os.path.join(cache_dir, f"source.{os.getpid()}.csv")
+    try:
+        content_hash, size = download(source, csv_path)
+        meta = read_meta(cache_dir)
+        unchanged = (
+            meta is not None
+            and meta.get("source") == source
+            and meta.get("hash") == content_hash
+            and meta.get("format") == SNAPSHOT_FORMAT
+            and os.path.exists(snapshot_path)
+        )
+        if unchanged:
+            columns = meta["columns"]
+        else:
+            started = time.perf_counter()
+            rows = write_csv_snapshot(csv_path, cache_dir)
+            columns = [name for name in pq.read_schema(snapshot_path).names if name != "profit"]
+            print(f"Instantánea regenerada: {rows} pedidos en {time.perf_counter() - started:.1f} s.")
+        remove_deltas(cache_dir)
+    finally:
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+    meta = {
+        "source": source,
+        "hash": content_hash,
+        "fetched_at": time.time(),
+        # Bytes ya ingeridos y cabecera original: permiten leer solo lo añadido.
+        "size": size,
+        "columns": columns,
+        "format": SNAPSHOT_FORMAT,
+        "deltas": [],
+    }
+    write_json(meta_path, meta)
+    return meta
+
+
+def fetch_appended(source, offset, path):
+    """Devuelve (bytes añadidos desde `offset`, None) o, cuando la fuente no
+    permite leer solo el final, (None, bytes de la fuente) tras copiarla
+    entera a `path` por trozos."""
+    if source.startswith(("http://", "https://")):
+        request = urllib.request.Request(source, headers={"Range": f"bytes={offset}-"})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                if response.status == 206:
+                    return response.read(), None
+                return None, copy_stream(response, path)[1]
+        except urllib.error.HTTPError as error:
+            if error.code == 416:
+                return b"", None
+            raise
+    if os.path.getsize(source) < offset:
+        # El fichero se ha reescrito, no ampliado.
+        return None, download(source, path)[1]
+    with open(source, "rb") as f:
+        f.seek(offset)
+        return f.read(), None
+
+
+def read_new_rows(source, offset, columns, since, cache_dir=CACHE_DIR):
+    """Pedidos añadidos a la fuente y nuevo offset."""
+    # Si hay que releer la fuente entera se hace como en refresh_snapshot:
+    # copia local por trozos y parseo por bloques, quedándose solo con lo nuevo.
+    os.makedirs(cache_dir, exist_ok=True)
+    csv_path = os.path.join(cache_dir, f"source.{os.getpid()}.csv")
+    try:
+        tail, size = fetch_appended(source, offset, csv_path)
+        if tail is None:
+            return read_csv(csv_path, since=since), size
+    finally:
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+    # Una línea a medio escribir se deja para la siguiente pasada.
+    tail = tail[: tail.rfind(b"\n") + 1]
+    if not tail.strip():
+        return None, offset + len(tail)
+    return read_csv(pa.BufferReader(tail), column_names=columns), offset + len(tail)
+
+
+def load_snapshot(source=SOURCE, ttl=SNAPSHOT_TTL, cache_dir=CACHE_DIR):
+    """Devuelve el dataset limpio y los metadatos de la instantánea usada."""
+    meta = read_meta(cache_dir)
+    if not is_fresh(meta, source, ttl, cache_dir):
+        try:
+            meta = refresh_snapshot(source, cache_dir)
+        except OSError:
+            # Sin red: se usa la instantánea caducada si existe.
+            snapshot_path, _ = _paths(cache_dir)
+            if meta is None or not os.path.exists(snapshot_path):
+                raise
+            print(f"No se pudo actualizar desde {source}; usando la instantánea local.")
+    df = read_snapshot(meta, cache_dir)
+    print(memory_report(df))
+    return df, meta
@@ -0,0 +1,56 @@
+# Reducción de puntos de la serie "Costos en el tiempo".
+#
+# Enviar al navegador más puntos que píxeles tiene el gráfico no aporta nada.
+# Se elige como mucho ~1 punto por píxel con Largest-Triangle-Three-Buckets,
+# que conserva picos y valles, y al hacer zoom se vuelve a reducir solo la
+# ventana visible, con más detalle.
+import os
+
+import numpy as np
+import pandas as pd
+
+# Puntos por defecto cuando todavía no se conoce el ancho del gráfico.
+LINE_POINTS = int(os.environ.get("TIENDAEUR_LINE_POINTS", 1000))
+MIN_POINTS = 100
+
+
+def target_points(width):
+    return max(int(width), MIN_POINTS) if width else LINE_POINTS
+
+
+def lttb(x, y, threshold):
+    """Índices (ordenados) de los `threshold` puntos que elige LTTB."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # threshold - 2 cubos entre el primer y el último punto, que se conservan.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Vértice C: la media del cubo siguiente.
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # Área (x2) del triángulo A-B-C para cada candidato B del cubo.
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def visible_dates(relayout_data):
+    # (inicio, fin) como "YYYY-MM-DD" de la ventana de fechas visible, o None.
+    if not relayout_data or relayout_data.get("xaxis.autorange") or relayout_data.get("autosize"):
+        return None
+    if "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+        low, high = relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    elif "xaxis.range" in relayout_data:
+        low, high = relayout_data["xaxis.range"]
+    else:
+        return None
+    low, high = sorted((pd.Timestamp(low), pd.Timestamp(high)))
+    return low.strftime("%Y-%m-%d"), high.strftime("%Y-%m-%d")
@@ -0,0 +1,124 @@
+# Caché en memoria de figuras ya convertidas a JSON.
+#
+# Las entradas se indexan por (versión del dataset, callback, argumentos
+# normalizados). Cada figura se serializa una vez al calcularla, para medir
+# su tamaño (el límite de memoria va en bytes de JSON), y se guarda ya
+# convertida a dict: un acierto la devuelve sin volver a parsearla. Las
+# figuras de la caché se comparten entre peticiones y no se modifican; quien
+# necesite cambiar algo copia antes la parte que toca. Al cambiar la versión
+# del dataset la caché se vacía.
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import plotly.io as pio
+
+MAX_BYTES = int(float(os.environ.get("TIENDAEUR_FIGURE_CACHE_MB", 64)) * 1024 * 1024)
+
+
+def normalize(value, ordered=()):
+    # Las listas (entradas multi-selección de Dash) son conjuntos: [] / None y
+    # el orden no importan. Las tuplas se conservan tal cual, y también los
+    # valores de las claves `ordered` de un dict (p. ej. los rangos de un
+    # estado de filtros): ahí el orden sí cambia el resultado.
+    if value is None:
+        return ()
+    if isinstance(value, list):
+        return tuple(sorted(normalize(v, ordered) for v in value))
+    if isinstance(value, tuple):
+        return tuple(normalize(v, ordered) for v in value)
+    if isinstance(value, dict):
+        return tuple(
+            sorted((k, _ordered(v) if k in ordered else normalize(v, ordered)) for k, v in value.items())
+        )
+    return value
+
+
+def _ordered(value):
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(_ordered(v) for v in value)
+    return value
+
+
+class FigureCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._entries.clear()
+                self._bytes = 0
+
+    def get(self, key, record=True):
+        # `record=False`: consulta que no cuenta como acierto ni como fallo.
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += record
+                return None
+            self._entries.move_to_end(key)
+            self.hits += record
+            return entry[0]
+
+    def put(self, key, figure, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key[0] != self.version:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (figure, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def memoize(self, func=None, *, ordered=()):
+        """Decorador; `ordered` son las claves de los dicts de argumentos
+        cuyo valor es un rango (ver normalize). Se usa como @memoize o como
+        @memoize(ordered=...)."""
+        if func is None:
+            return lambda func: self.memoize(func, ordered=ordered)
+
+        def key(args):
+            return (self.version, func, tuple(normalize(arg, ordered) for arg in args))
+
+        @wraps(func)
+        def wrapper(*args):
+            figure = self.get(key(args))
+            if figure is None:
+                payload = pio.to_json(func(*args), validate=False)
+                figure = json.loads(payload)
+                self.put(key(args), figure, len(payload))
+            return figure
+
+        def cached(*args):
+            # Figura ya calculada para estos argumentos, o None (sin calcularla).
+            return self.get(key(args), record=False)
+
+        wrapper.cached = cached
+        return wrapper
+
+
+figure_cache = FigureCache()
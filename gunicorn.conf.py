@@ -0,0 +1,17 @@
+# Configuración de gunicorn para producción: gunicorn -c gunicorn.conf.py
+#
+# El maestro carga el dataset una sola vez y lo publica en ficheros Arrow
+# mapeados en memoria; los workers se adjuntan a ellos sin copiarlos.
+import os
+
+os.environ.setdefault("TIENDAEUR_SHARED", "1")
+
+wsgi_app = "app:server"
+bind = os.environ.get("BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+
+
+def on_starting(server):
+    from shared import prepare
+
+    prepare()
@@ -0,0 +1,133 @@
+# Callbacks pesados en segundo plano (TIENDAEUR_BACKGROUND=1).
+#
+# El scatter y la serie temporal se ejecutan como background callbacks de
+# Dash: cada petición lanza un proceso hijo (fork, comparte el dataset por
+# copy-on-write) y el navegador consulta el resultado cada POLL_MS, así el
+# hilo de Flask queda libre. Dash ya cancela el trabajo anterior cuando el
+# mismo callback se vuelve a disparar (p. ej. al mover otra vez el slider);
+# `SharedJobManager` añade que dos peticiones idénticas en curso compartan
+# un único proceso. Los tiempos que mide `instrument` en el proceso hijo se
+# dejan en la misma caché y /metrics los recoge. Requiere diskcache, multiprocess y psutil
+# (`pip install "dash[diskcache]"`).
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from dash import DiskcacheManager
+
+from data import CACHE_DIR
+from figcache import figure_cache
+from metrics import add_collector, capture, merge
+
+BACKGROUND = os.environ.get("TIENDAEUR_BACKGROUND") == "1"
+JOBS_DIR = os.environ.get("TIENDAEUR_JOBS_DIR", os.path.join(CACHE_DIR, "jobs"))
+POLL_MS = int(os.environ.get("TIENDAEUR_JOBS_POLL_MS", 250))
+# Segundos que se conserva en disco un resultado que nadie vuelve a pedir.
+RESULT_TTL = 600
+# Reserva de un trabajo que aún no tiene proceso (pid 0 no es un trabajo),
+# cuánto puede durar y cada cuánto la consulta una petición idéntica.
+STARTING = 0
+START_TIMEOUT = 10
+START_POLL = 0.01
+
+METRICS_PREFIX = "metrics"
+
+_set_progress = ContextVar("set_progress", default=None)
+# Caché de los trabajos; la heredan por fork los procesos hijos.
+_jobs_cache = None
+
+
+class SharedJobManager(DiskcacheManager):
+    """DiskcacheManager que reutiliza el proceso de una petición idéntica en curso.
+
+    Por cada clave de caché se guarda (pid, peticiones que lo esperan). Un
+    proceso solo se mata cuando lo abandona la última petición que lo espera.
+    """
+
+    def call_job_fn(self, key, job_fn, args, context):
+        # La clave se reserva en la misma transacción que comprueba si hay un
+        # proceso en curso: de dos peticiones idénticas solo una lo lanza. La
+        # otra espera a que la reserva tenga pid y se suma como interesada.
+        while True:
+            with self.handle.transact():
+                job, waiters = self.handle.get(f"{key}-job", (None, 0))
+                if job is not None and job != STARTING and self.job_running(job):
+                    self.handle.set(f"{key}-job", (job, waiters + 1))
+                    return job
+                if job != STARTING:
+                    # Caduca sola si este proceso muere antes de lanzar el trabajo.
+                    self.handle.set(f"{key}-job", (STARTING, 1), expire=START_TIMEOUT)
+                    break
+            time.sleep(START_POLL)
+        try:
+            job = super().call_job_fn(key, job_fn, args, context)
+        except BaseException:
+            self.handle.delete(f"{key}-job")
+            raise
+        with self.handle.transact():
+            self.handle.set(f"{key}-job", (job, 1))
+            self.handle.set(f"job-{job}", key)
+        return job
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        key = self.handle.get(f"job-{job}")
+        if key is not None:
+            with self.handle.transact():
+                running, waiters = self.handle.get(f"{key}-job", (None, 0))
+                if running == int(job) and waiters > 1:
+                    self.handle.set(f"{key}-job", (running, waiters - 1))
+                    return
+                self.handle.delete(f"{key}-job")
+                self.handle.delete(f"job-{job}")
+        super().terminate_job(job)
+
+
+def background_manager():
+    if not BACKGROUND:
+        return None
+    import diskcache
+
+    global _jobs_cache
+    _jobs_cache = diskcache.Cache(JOBS_DIR)
+    add_collector(collect_job_metrics)
+    # Con cache_by los resultados terminados se guardan (la versión del
+    # dataset ya forma parte de los argumentos de cada callback).
+    return SharedJobManager(_jobs_cache, cache_by=[lambda: figure_cache.version], expire=RESULT_TTL)
+
+
+def collect_job_metrics():
+    # Cada lote lo recoge un único proceso del servidor (pull lo borra).
+    while True:
+        _, observations = _jobs_cache.pull(prefix=METRICS_PREFIX)
+        if observations is None:
+            return
+        merge(observations)
+
+
+def with_progress(func):
+    # En modo background Dash pasa `set_progress` como primer argumento y el
+    # callback corre en el proceso hijo: sus métricas se envían al servidor.
+    if not BACKGROUND:
+        return func
+
+    @wraps(func)
+    def wrapper(set_progress, *args):
+        token = _set_progress.set(set_progress)
+        try:
+            with capture() as observations:
+                return func(*args)
+        finally:
+            _set_progress.reset(token)
+            if observations and _jobs_cache is not None:
+                _jobs_cache.push(observations, prefix=METRICS_PREFIX, expire=RESULT_TTL)
+
+    return wrapper
+
+
+def report_progress(percent):
+    set_progress = _set_progress.get()
+    if set_progress is not None:
+        set_progress(percent)
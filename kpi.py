@@ -0,0 +1,97 @@
+# Tarjetas KPI calculadas por lotes sobre las celdas del cubo.
+#
+# Cada tarjeta es una medida con filtros propios (p. ej. ganancia en PC) que
+# se combinan con los filtros del dashboard. Todas las tarjetas, y sus
+# valores en el periodo actual y el anterior, salen de una sola
+# multiplicación de matrices: selectores (tarjetas × celdas) por medidas
+# ponderadas por ventana (celdas × medidas·ventanas). El formato también se
+# aplica a arrays completos.
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+KpiCard = namedtuple("KpiCard", ["id", "label", "measure", "filters"])
+
+KPI_CARDS = [
+    KpiCard("kpi_total_profit", "Ganancias totales", "profit", {}),
+    KpiCard("kpi_profit_pc", "Total de ganancias en PC", "profit", {"device_type": "PC"}),
+    KpiCard("kpi_total_cost", "Costos totales", "cost", {}),
+    KpiCard("kpi_orders", "Pedidos", "orders", {}),
+]
+
+MEASURES = ["profit", "cost", "orders"]
+# Granularidad del filtro de periodo -> periodo de pandas con el que se compara.
+DELTA_PERIODS = {"Week": ("W", "la semana"), "Month": ("M", "el mes"), "Quarter": ("Q", "el trimestre"), "Year": ("Y", "el año")}
+UNITS = np.array(["", "K", "M", "B", "T"])
+
+
+def abbreviate(values):
+    """Formatea un array de números como "1.23K", "4.56M"... de una vez."""
+    values = np.asarray(values, dtype=float)
+    magnitude = np.abs(values)
+    exponent = sum((magnitude >= 1000.0**k).astype(int) for k in range(1, len(UNITS)))
+    scaled = values / 1000.0**exponent
+    return np.char.add(np.char.mod("%.2f", scaled), UNITS[exponent])
+
+
+def abbreviate_number(num):
+    return str(abbreviate([num])[0])
+
+
+def format_deltas(deltas, period_label):
+    deltas = np.asarray(deltas, dtype=float)
+    arrows = np.where(deltas >= 0, "▲", "▼")
+    text = np.char.add(np.char.add(arrows, " "), np.char.mod("%.1f %%", np.abs(deltas) * 100))
+    text = np.char.add(text, f" vs {period_label} anterior")
+    return np.where(np.isfinite(deltas), text, "")
+
+
+def _windows(dates, last_date, granularity):
+    # Periodo en curso hasta `last_date` y el mismo tramo del periodo anterior.
+    freq, label = DELTA_PERIODS.get(granularity, DELTA_PERIODS["Month"])
+    current = pd.Period(last_date, freq)
+    current_start = current.start_time
+    previous_start = (current - 1).start_time
+    elapsed = pd.Timestamp(last_date).normalize() - current_start
+    in_current = (dates >= current_start) & (dates <= current_start + elapsed)
+    in_previous = (dates >= previous_start) & (dates <= previous_start + elapsed)
+    return np.column_stack([np.ones(len(dates), dtype=bool), in_current, in_previous]), label
+
+
+def compute_kpis(cells, filters, last_date, granularity="Month", cards=KPI_CARDS):
+    """Valores formateados y variaciones de cada tarjeta.
+
+    `filters` es {columna: valor | lista | "All" | None}; una lista vacía no
+    deja pasar ninguna celda. Los filtros propios de una tarjeta sustituyen a
+    los del dashboard en la misma columna.
+    Devuelve (valores, variaciones), dos arrays de texto en el orden de `cards`.
+    """
+    masks = {}
+
+    def mask(column, selected):
+        key = (column, tuple(selected))
+        if key not in masks:
+            masks[key] = cells[column].isin(selected).to_numpy()
+        return masks[key]
+
+    selectors = np.ones((len(cards), len(cells)), dtype=bool)
+    for k, card in enumerate(cards):
+        for column, selected in {**filters, **card.filters}.items():
+            if selected is None or selected == "All":
+                continue
+            selected = [selected] if isinstance(selected, str) else list(selected)
+            selectors[k] &= mask(column, selected)
+
+    windows, period_label = _windows(cells["date"].to_numpy(), last_date, granularity)
+    values = cells[MEASURES].to_numpy(dtype=float)
+    # (celdas, medidas, ventanas) -> (tarjetas, medidas, ventanas) en un solo producto.
+    weighted = (values[:, :, None] * windows[:, None, :]).reshape(len(cells), -1)
+    totals = (selectors.astype(float) @ weighted).reshape(len(cards), len(MEASURES), windows.shape[1])
+
+    measure_index = np.array([MEASURES.index(card.measure) for card in cards])
+    picked = totals[np.arange(len(cards)), measure_index]
+    total, current, previous = picked[:, 0], picked[:, 1], picked[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deltas = np.where(previous != 0, (current - previous) / np.abs(previous), np.nan)
+    return abbreviate(total), format_deltas(deltas, period_label)
@@ -0,0 +1,122 @@
+# Caché del layout inicial (GET /_dash-layout) con revalidación HTTP.
+#
+# El layout trae ya la página pedida con las figuras y los KPI del estado por
+# defecto (ver `serve_layout` en app.py y `warm_start` en pages/dashboard.py),
+# así que su JSON solo cambia con la versión del dataset, la página y el
+# código. Se guarda serializado por (versión, página) —las LAYOUT_ENTRIES
+# más usadas, porque la búsqueda de la URL entra en la clave y la pone el
+# cliente— y se envía con ETag y
+# Last-Modified y `Cache-Control: no-cache`: en las visitas siguientes el
+# navegador revalida y recibe un 304 sin cuerpo si nada cambió.
+#
+# El ETag es débil (W/"..."): el cuerpo puede ir comprimido con br o gzip
+# (ver transport.py) y la representación es la misma en cualquier caso.
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import dash
+from flask import Response, g, has_request_context, request
+from werkzeug.http import http_date, parse_date
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Lo que cambia el layout además de los datos: el código y los flags.
+CODE_FILES = ("*.py", "pages/*.py", "assets/*")
+# Layouts serializados que se conservan (unos 30 KB cada uno).
+LAYOUT_ENTRIES = 32
+
+
+def code_fingerprint():
+    """Huella del código y de los flags TIENDAEUR_* y fecha de su último cambio.
+
+    Es la misma en todos los workers de gunicorn, así un 304 vale aunque la
+    revalidación llegue a otro proceso.
+    """
+    paths = sorted(path for pattern in CODE_FILES for path in glob.glob(os.path.join(ROOT, pattern)))
+    mtimes = [os.path.getmtime(path) for path in paths]
+    flags = sorted((name, value) for name, value in os.environ.items() if name.startswith("TIENDAEUR_"))
+    digest = hashlib.sha256(repr((list(zip(paths, mtimes)), flags)).encode()).hexdigest()
+    return digest[:16], max(mtimes, default=0.0)
+
+
+def requested_page():
+    """(pathname, search) de la página desde la que se pide el layout.
+
+    El renderer de Dash pide /_dash-layout desde la propia página, así que la
+    URL llega en el Referer. Sin Referer del mismo host no se sabe qué página
+    es y el layout va sin contenido (lo pone el router de Dash); tampoco
+    fuera de una petición (Dash valida el layout al asignarlo).
+    """
+    if not has_request_context():
+        return None, ""
+    referrer = urlsplit(request.referrer or "")
+    if referrer.netloc != request.host:
+        return None, ""
+    pathname = referrer.path or "/"
+    if not any(page["relative_path"] == pathname for page in dash.page_registry.values()):
+        return None, ""
+    return pathname, f"?{referrer.query}" if referrer.query else ""
+
+
+def init_layout_cache(app, store):
+    # Se registra después de init_transport: sus after_request corren antes
+    # que el de flask-compress, así el cuerpo guardado es el sin comprimir.
+    server = app.server
+    layout_path = app.config.routes_pathname_prefix + "_dash-layout"
+    fingerprint, code_modified = code_fingerprint()
+    cache = OrderedDict()
+    lock = threading.Lock()
+
+    def validators(key):
+        version, page = key
+        etag = hashlib.sha256(f"{fingerprint}:{version}:{page}".encode()).hexdigest()[:32]
+        modified = max(code_modified, store.meta.get("fetched_at", 0.0))
+        return f'W/"{etag}"', int(modified)
+
+    def not_modified(etag, modified):
+        # If-None-Match manda; If-Modified-Since solo cuenta sin él.
+        if "If-None-Match" in request.headers:
+            tags = [tag.strip() for tag in request.headers["If-None-Match"].split(",")]
+            return etag in tags or "*" in tags
+        since = parse_date(request.headers.get("If-Modified-Since"))
+        return since is not None and modified <= since.timestamp()
+
+    @server.before_request
+    def _serve_cached_layout():
+        if request.method != "GET" or request.path != layout_path:
+            return None
+        pathname, search = requested_page()
+        g.layout_key = key = (store.version, f"{pathname}{search}")
+        etag, modified = validators(key)
+        if not_modified(etag, modified):
+            return Response(status=304)
+        with lock:
+            body = cache.get(key)
+            if body is not None:
+                cache.move_to_end(key)
+        if body is not None:
+            return Response(body, mimetype="application/json")
+        return None
+
+    @server.after_request
+    def _store_layout(response):
+        key = g.pop("layout_key", None)
+        if key is None:
+            return response
+        etag, modified = validators(key)
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(modified)
+        response.headers["Cache-Control"] = "no-cache"
+        response.vary.add("Referer")
+        # Solo se guarda el de la versión vigente; las anteriores se descartan.
+        if response.status_code == 200 and key[0] == store.version and key not in cache:
+            with lock:
+                for stale in [cached for cached in cache if cached[0] != key[0]]:
+                    del cache[stale]
+                cache[key] = response.get_data()
+                while len(cache) > LAYOUT_ENTRIES:
+                    cache.popitem(last=False)
+        return response
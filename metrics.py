@@ -0,0 +1,198 @@
+# Instrumentación de los callbacks y ruta /metrics en formato Prometheus.
+#
+# `instrument` envuelve cada callback y mide su tiempo total; dentro de él,
+# `phase("filter")` / `phase("figure")` separan el filtrado de pandas y la
+# construcción de la figura. El tiempo de serialización y los bytes de la
+# respuesta se miden en Flask, después de que Dash codifique la salida.
+import cProfile
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+
+from data import CACHE_DIR
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# Con TIENDAEUR_PROFILE_SLOW_MS los callbacks se ejecutan bajo cProfile y se
+# guarda el perfil de los que superan ese umbral.
+PROFILE_SLOW_MS = float(os.environ.get("TIENDAEUR_PROFILE_SLOW_MS", 0))
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+
+
+class Histogram:
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        outbox = getattr(_local, "outbox", None)
+        if outbox is not None:
+            outbox.append((self.name, labels, value))
+        with self._lock:
+            counts, total = self._series.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, (counts, total) in series:
+            label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return "\n".join(lines)
+
+
+class Gauge:
+    """Valor que se lee al servir /metrics; `kind` es "gauge" o "counter"."""
+
+    def __init__(self, name, documentation, read, kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.kind = kind
+
+    def render(self):
+        return "\n".join(
+            [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", f"{self.name} {self.read()}"]
+        )
+
+
+phase_seconds = Histogram(
+    "tiendaeur_callback_phase_seconds",
+    "Duración de cada fase de los callbacks (filter, figure, callback, serialize).",
+    ("callback", "phase"),
+    SECONDS_BUCKETS,
+)
+response_bytes = Histogram(
+    "tiendaeur_callback_response_bytes",
+    "Tamaño de la respuesta JSON de cada callback.",
+    ("callback",),
+    BYTES_BUCKETS,
+)
+
+HISTOGRAMS = {histogram.name: histogram for histogram in (phase_seconds, response_bytes)}
+
+_local = threading.local()
+# Funciones que /metrics llama antes de responder (ver add_collector).
+_collectors = []
+_gauges = []
+
+
+def _current_callback():
+    return getattr(_local, "callback", "-")
+
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_seconds.observe((_current_callback(), name), time.perf_counter() - start)
+
+
+def _dump_profile(profiler, name, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1000)}ms.prof")
+    profiler.dump_stats(path)
+
+
+def instrument(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        outer = getattr(_local, "callback", None)
+        _local.callback = func.__name__
+        profiler = cProfile.Profile() if PROFILE_SLOW_MS > 0 and outer is None else None
+        start = time.perf_counter()
+        try:
+            if profiler is None:
+                return func(*args, **kwargs)
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if outer is None:
+                # Fuera de un callback vuelve a contar como "-" (ver _current_callback).
+                del _local.callback
+                phase_seconds.observe((func.__name__, "callback"), elapsed)
+                if has_request_context():
+                    g.metrics_callback = func.__name__
+                    g.metrics_callback_seconds = elapsed
+                if profiler is not None and elapsed * 1000 >= PROFILE_SLOW_MS:
+                    _dump_profile(profiler, func.__name__, elapsed)
+            else:
+                _local.callback = outer
+
+    return wrapper
+
+
+@contextmanager
+def capture():
+    """Apunta además en una lista las observaciones hechas dentro del bloque.
+
+    Sirve para los callbacks que se ejecutan en otro proceso (jobs.py): la
+    lista se envía al servidor, que la incorpora con `merge`.
+    """
+    _local.outbox = observations = []
+    try:
+        yield observations
+    finally:
+        del _local.outbox
+
+
+def merge(observations):
+    for name, labels, value in observations:
+        HISTOGRAMS[name].observe(tuple(labels), value)
+
+
+def add_collector(collect):
+    # `collect()` incorpora las observaciones pendientes de otros procesos.
+    _collectors.append(collect)
+
+
+def add_gauge(name, documentation, read, kind="gauge"):
+    _gauges.append(Gauge(name, documentation, read, kind))
+
+
+def render():
+    for collect in _collectors:
+        collect()
+    sections = [phase_seconds.render(), response_bytes.render()] + [gauge.render() for gauge in _gauges]
+    return "\n".join(sections) + "\n"
+
+
+def init_metrics(server):
+    @server.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def _record_response(response):
+        name = g.pop("metrics_callback", None)
+        if name is None or not request.path.endswith("_dash-update-component"):
+            return response
+        total = time.perf_counter() - g.metrics_start
+        phase_seconds.observe((name, "serialize"), max(total - g.metrics_callback_seconds, 0.0))
+        response_bytes.observe((name,), response.calculate_content_length() or 0)
+        return response
+
+    @server.route("/metrics")
+    def _metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,846 @@
+# Página principal: KPI, resumen, análisis y tabla del dataset.
+#
+# Los datos, la fuente de los callbacks y las figuras compartidas con otras
+# páginas vienen del servicio de datos (ver service.py).
+import copy
+import json
+import os
+from functools import wraps
+
+import dash
+from dash import html, dash_table, dcc, callback, clientside_callback, ctx, ClientsideFunction, Output, Input, State, Patch, no_update
+from dash.exceptions import PreventUpdate
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import dash_bootstrap_components as dbc
+import dash_daq as daq
+
+from approx import APPROX, Z_95
+from components import (
+    category_options,
+    country_options,
+    graph_column,
+    prerender,
+    primary_color,
+    summary_filters,
+    title_row,
+)
+from crossfilter import (
+    CHART_DIMENSIONS,
+    EMPTY_FILTERS,
+    RANGE_DIMENSIONS,
+    active_filters,
+    clicked,
+    combine,
+    for_chart,
+    selected_box,
+    selected_values,
+)
+from downsample import lttb, target_points, visible_dates
+from figcache import figure_cache
+from jobs import BACKGROUND, POLL_MS, report_progress, with_progress
+from kpi import KPI_CARDS, abbreviate_number, compute_kpis
+from metrics import instrument, phase
+from scatter import DENSITY_BINS, density_figure, histogram, is_zoom_event, points_figure, render_mode, visible_window
+from service import (
+    approximate_cost_device,
+    approximate_profit_country,
+    approximate_title,
+    source,
+    store,
+    update_cost_device,
+    update_profit_country,
+)
+from store import REFRESH_SECONDS
+from transport import COMPACT, epoch_ms, typed_array
+
+dash.register_page(__name__, path="/", name="Informes", title="TiendaEUR Informes")
+
+# Con TIENDAEUR_CLIENTSIDE=1 los filtros de dispositivo, categoría y periodo se
+# resuelven en el navegador a partir de agregados enviados una sola vez.
+CLIENTSIDE = os.environ.get("TIENDAEUR_CLIENTSIDE") == "1"
+
+# Con TIENDAEUR_APPROX=1 estas gráficas se responden primero con una
+# estimación sobre la muestra estratificada (ver approx.py) y después con el
+# resultado exacto. En modo CLIENTSIDE las de barras y la tarta ya se
+# calculan en el navegador.
+PROGRESSIVE_CHARTS = (["profit_vs_cost"] + ([] if CLIENTSIDE else ["profit_country", "cost_device"])) if APPROX else []
+
+month_names = {
+    1: "Enero",
+    2: "Febrero",
+    3: "Marzo",
+    4: "Abril",
+    5: "Mayo",
+    6: "Junio",
+    7: "Julio",
+    8: "Agosto",
+    9: "Septiembre",
+    10: "Octubre",
+    11: "Noviembre",
+    12: "Diciembre"
+}
+
+progress_hidden = {"visibility": "hidden", "height": "6px"}
+progress_visible = {"visibility": "visible", "height": "6px"}
+
+# Valor del filtro de periodo -> granularidad de los agregados temporales.
+period_granularity = {"All": "Day", "Year": "Year", "Quarter": "Quarter", "Month": "Month", "Week": "Week"}
+
+
+def period_series(period, rollups=None):
+    # Los agregados ya están agrupados por (año, periodo); aquí solo se
+    # ponen las etiquetas del eje X.
+    series = (rollups or store.state.rollups).series(period_granularity[period])
+    year = series['year'].astype(str)
+    if period == "All":
+        dates = series['start']
+    elif period == "Year":
+        dates = year
+    elif period == "Quarter":
+        dates = "T" + series['period'].astype(str) + " " + year
+    elif period == "Month":
+        dates = series['period'].map(month_names) + " " + year
+    elif period == "Week":
+        dates = year + "-S" + series['period'].astype(str).str.zfill(2)
+    return pd.DataFrame({'date': dates, 'cost': series['cost']})
+
+
+def selected_dates(selected_data, period):
+    # [inicio, fin] ("YYYY-MM-DD") del tramo seleccionado en "Costos en el tiempo".
+    if not selected_data:
+        return None
+    if period == "All":
+        if "range" in selected_data:
+            xs = selected_data["range"]["x"]
+        else:
+            xs = [point["x"] for point in selected_data.get("points", [])]
+        if not xs:
+            return None
+        dates = pd.to_datetime(xs)
+        return [dates.min().strftime("%Y-%m-%d"), dates.max().strftime("%Y-%m-%d")]
+    # Eje por periodos: las etiquetas de los puntos seleccionados se
+    # traducen al primer y al último día de esos periodos.
+    labels = [point["x"] for point in selected_data.get("points", [])]
+    picked = np.flatnonzero(period_series(period)['date'].isin(labels))
+    if not len(picked):
+        return None
+    starts = store.state.rollups.series(period_granularity[period])['start']
+    end = starts.iloc[picked[-1] + 1] - pd.Timedelta(days=1) if picked[-1] + 1 < len(starts) else store.state.last_date
+    return [starts.iloc[picked[0]].strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")]
+
+
+def client_aggregates():
+    # Tablas compactas (una fila por grupo o por día, nunca por pedido) que
+    # necesitan los callbacks del navegador.
+    state = store.state
+    aggregates = state.cube.to_client()
+    aggregates["periods"] = {}
+    for period in period_granularity:
+        series = period_series(period)
+        dates = series['date'].dt.strftime('%Y-%m-%d') if period == "All" else series['date']
+        aggregates["periods"][period] = {"x": dates.tolist(), "y": series['cost'].tolist()}
+    aggregates["cost_min"] = state.rollups.cost_min.tolist()
+    aggregates["cost_max"] = state.rollups.cost_max.tolist()
+    if COMPACT:
+        for name in ("profit_by_country", "cost_by_device", "periods"):
+            for view in aggregates[name].values():
+                view["y"] = typed_array(view["y"])
+    aggregates["primary_color"] = primary_color
+    aggregates["pie_colors"] = px.colors.sequential.RdBu
+    return aggregates
+
+
+def kpi_card(card, value=None, delta=None):
+    # El layout trae los valores sin filtros; después los actualiza
+    # `update_kpis` según los filtros actuales.
+    return dbc.Col(
+        dbc.Card(
+            [
+                dbc.CardHeader(card.label),
+                dbc.CardBody(
+                    [
+                        html.H4(value, id=card.id, className="card-title"),
+                        html.Small(delta, id=f"{card.id}_delta", className="text-muted"),
+                    ]
+                ),
+            ],
+            style={
+                "textAlign": "center",
+                "fontFamily": "Segoe UI",
+            },
+        )
+    )
+
+
+def progress_bar(progress_id):
+    return dbc.Progress(id=progress_id, value=100, striped=True, animated=True, color="danger", style=progress_hidden)
+
+
+def heavy_callback_options(graph_id):
+    # La barra se ve mientras el callback está en curso. Con
+    # TIENDAEUR_BACKGROUND=1 se ejecuta en un proceso aparte (ver jobs.py) y
+    # la barra muestra el avance que va informando.
+    options = dict(running=[(Output(f"{graph_id}_progress", "style"), progress_visible, progress_hidden)])
+    if BACKGROUND:
+        options.update(
+            background=True,
+            interval=POLL_MS,
+            progress=[Output(f"{graph_id}_progress", "value")],
+            progress_default=[100],
+            # update_scatter y update_time_cost dependen de qué input cambió.
+            cache_ignore_triggered=False,
+        )
+    return options
+
+
+def warm_start(state):
+    """Calcula las figuras del estado por defecto (sin filtros ni selecciones).
+
+    Se llama al arrancar y con cada versión nueva del dataset: el layout
+    lleva ya las de la pestaña "Resumen" (y los KPI), y las de "Análisis"
+    quedan en la caché de figuras para cuando se abra la pestaña. La serie
+    de "Costos en el tiempo" depende del ancho de la gráfica en el
+    navegador; sus agregados ya se calculan al cargar los datos.
+    """
+    figures = {
+        "profit_country": update_profit_country(EMPTY_FILTERS, state.version),
+        "cost_device": update_cost_device(EMPTY_FILTERS, state.version),
+    }
+    scatter_view(EMPTY_FILTERS, None)
+    return figures
+
+
+def layout(**query):
+    # Dash pasa los parámetros de la URL en `query`; esta página no usa ninguno.
+    # El layout se construye con el estado actual y trae ya las figuras y los
+    # KPI sin filtros (salvo el esqueleto, ver components.skeleton), así la
+    # primera visita no lanza ningún callback. Las
+    # gráficas de las otras pestañas se calculan al abrirlas por primera vez
+    # (ver `deferred`). El JSON se guarda por versión del dataset (ver
+    # layoutcache.py).
+    state = store.state
+    if prerender():
+        figures = warm_start(state)
+        values = kpi_values(state, EMPTY_FILTERS, "All")
+    else:
+        figures, values = {}, [None] * (2 * len(KPI_CARDS))
+    return html.Div(
+        children=[
+            dbc.Row(
+                justify="center",
+                align="center",
+                children=[
+                    kpi_card(card, value, delta)
+                    for card, value, delta in zip(KPI_CARDS, values, values[len(KPI_CARDS) :])
+                ],
+            ),
+            html.Br(),
+            dbc.Tabs(
+                id="tabs",
+                active_tab="summary",
+                children=[
+                    dbc.Tab(
+                        label="Resumen",
+                        tab_id="summary",
+                        children=[
+                            html.Br(),
+                            summary_filters(state),
+                            dbc.Row(
+                                [
+                                    graph_column("Ganancias por país", "profit_country", figure=figures.get("profit_country")),
+                                    graph_column("Costos según dispositivo", "cost_device", figure=figures.get("cost_device")),
+                                ]
+                            ),
+                        ],
+                    ),
+                    dbc.Tab(
+                        label="Análisis",
+                        tab_id="analysis",
+                        children=[
+                            html.Br(),
+                            dbc.Row(
+                                justify="center",
+                                align="center",
+                                children=[
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id="select",
+                                            multi=True,
+                                            placeholder="Selecciona un país",
+
+                                            options=  country_options(state),
+                                            style={
+                                                "backgroundColor": "white",
+                                                "color": "black",
+                                            },
+                                        ),  
+                                    ),
+                                    dbc.Col(
+                                        dcc.Slider(
+                                            id='date-slider',
+                                            min=0,
+                                            max=len(state.daily) - 1,
+                                            value=len(state.daily) - 1,
+                                            tooltip={"placement": "bottom", "always_visible": True},
+                                            included=True,
+
+                                        ),style={  
+                                                "color": primary_color,
+                                        },
+
+                                    ),
+                                ],
+                                className="slider-group",
+                            ),
+                            dbc.Row(
+                                [
+                                    graph_column(
+                                        "Ganancia según el costo",
+                                        "profit_vs_cost",
+                                        progress_bar("profit_vs_cost_progress"),
+                                    ),
+                                    graph_column(
+                                        "Costos en el tiempo",
+                                        "cost_datetime",
+                                        progress_bar("cost_datetime_progress"),
+                                        dbc.RadioItems(
+                                            id="filter_period",
+                                            className="btn-group",
+                                            inputClassName="btn-check",
+                                            labelClassName="btn btn-light",
+                                            labelCheckedClassName="active",
+                                            options=[
+                                                {"label": "Todo", "value": "All"},
+                                                {"label": "Año", "value": "Year"},
+                                                {"label": "Trimestre", "value": "Quarter"},
+                                                {"label": "Mes", "value": "Month"},
+                                                {"label": "Semana", "value": "Week"},
+                                            ],
+                                            value="All",
+                                        ),
+                                    ),
+                                ]
+                            ),
+                        ],
+                    ),
+                    dbc.Tab(
+                        label="Dataset",
+                        tab_id="data",
+                        children=[
+                            html.Br(),
+                            title_row("TiendaEUR Dataset", html.H3),
+                            dbc.Row(
+                                dbc.Col(
+                                    dash_table.DataTable(
+                                        id="orders_table",
+                                        columns=[{"name": column, "id": column} for column in state.df.columns],
+                                        page_current=0,
+                                        page_size=10,
+                                        page_action="custom",
+                                        sort_action="custom",
+                                        sort_mode="multi",
+                                        sort_by=[],
+                                        filter_action="custom",
+                                        filter_query="",
+                                        style_table={'overflowX': 'auto'},
+                                    ),
+                                    style={
+                                        "textAlign": "center",
+                                        "fontFamily": "Segoe UI",
+                                    },
+                                ),
+                                justify="center",
+                                align="center",
+                            ),
+                        ],
+                    ),
+                ],
+            ),
+            dcc.Store(id="aggregates", data=client_aggregates() if CLIENTSIDE else None),
+            # Filtrado cruzado: selecciones hechas en las gráficas, estado de
+            # filtros completo (KPI) y los filtros que ve cada gráfica.
+            dcc.Store(id="selections", data={}),
+            dcc.Store(id="filters", data=EMPTY_FILTERS),
+            *[dcc.Store(id=f"{chart}_filters", data=EMPTY_FILTERS) for chart in CHART_DIMENSIONS],
+            # Modo aproximado: argumentos de la última figura estimada de cada
+            # gráfica, pendiente de sustituir por la exacta.
+            *[dcc.Store(id=f"{chart}_exact") for chart in PROGRESSIVE_CHARTS],
+            # Pestañas que el navegador ya ha abierto; sus gráficas se calculan
+            # la primera vez que aparecen en la lista.
+            dcc.Store(id="seen_tabs", data=["summary"]),
+            # Ancho en píxeles de "Costos en el tiempo"; fija cuántos puntos se envían.
+            dcc.Store(id="cost_datetime_width"),
+            # Página de la tabla por columnas (modo TIENDAEUR_COMPACT).
+            dcc.Store(id="orders_page"),
+            # Versión del dataset que ve el navegador; el intervalo la compara con
+            # la del servidor para enterarse de los refrescos.
+            dcc.Store(id="data_version", data=state.version),
+            dcc.Interval(id="refresh_interval", interval=max(REFRESH_SECONDS, 5) * 1000, disabled=REFRESH_SECONDS <= 0),
+        ],
+    )
+
+
+clientside_callback(
+    ClientsideFunction(namespace="tiendaeur", function_name="markTabSeen"),
+    Output("seen_tabs", "data"),
+    Input("tabs", "active_tab"),
+    State("seen_tabs", "data"),
+)
+clientside_callback(
+    ClientsideFunction(namespace="tiendaeur", function_name="costDatetimeWidth"),
+    Output("cost_datetime_width", "data"),
+    Input("seen_tabs", "data"),
+)
+
+
+def progressive(exact, approximate):
+    """Responde con la estimación de `approximate` y deja pendiente la exacta.
+
+    Devuelve (figura, petición). Si la figura exacta ya está en la caché, o
+    si `approximate` devuelve None (la exacta es igual de rápida), se envía
+    la exacta. La petición se escribe siempre en `<gráfica>_exact`: así el
+    callback de `swap_exact` de una petición anterior queda descartado.
+    Fuera del modo aproximado devuelve `exact` sin cambios.
+    """
+    if not APPROX:
+        return exact
+
+    @wraps(exact)
+    def wrapper(*args):
+        figure = exact.cached(*args)
+        if figure is None:
+            figure = approximate(*args)
+            if figure is not None:
+                return figure, {"args": args, "exact": False}
+            figure = exact(*args)
+        return figure, {"args": args, "exact": True}
+
+    return wrapper
+
+
+def exact_outputs(chart):
+    # Salida adicional de las gráficas del modo aproximado.
+    return [Output(f"{chart}_exact", "data")] if chart in PROGRESSIVE_CHARTS else []
+
+
+def swap_exact(exact, decode=None):
+    # Callback que calcula la figura exacta de la última estimación enviada.
+    def swap(request):
+        if not request or request["exact"]:
+            raise PreventUpdate
+        args = request["args"]
+        return exact(*(decode(args) if decode else args))
+
+    swap.__name__ = f"{exact.__name__}_exact"
+    return instrument(swap)
+
+
+def deferred(tab_id):
+    """Aplaza un callback hasta que su pestaña se abre por primera vez.
+
+    El callback recibe `seen_tabs` como primer argumento. Mientras la pestaña
+    no se haya abierto no se calcula nada; cuando se abre otra pestaña
+    distinta tampoco se repite el cálculo.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(seen_tabs, *args):
+            if tab_id not in (seen_tabs or []):
+                raise PreventUpdate
+            if ctx.triggered_id == "seen_tabs" and seen_tabs[-1] != tab_id:
+                raise PreventUpdate
+            return func(*args)
+
+        return wrapper
+
+    return decorator
+
+
+# Eventos de selección de las gráficas que alimentan el filtrado cruzado.
+SELECTION_EVENTS = [
+    ("profit_country", "clickData"),
+    ("profit_country", "selectedData"),
+    ("cost_device", "clickData"),
+    ("cost_datetime", "selectedData"),
+    ("profit_vs_cost", "selectedData"),
+]
+
+
+def selection_for(graph, prop, data, previous, period):
+    if graph == "profit_country":
+        return clicked(data, "x", previous) if prop == "clickData" else selected_values(data, "x")
+    if graph == "cost_device":
+        return clicked(data, "label", previous)
+    if graph == "cost_datetime":
+        return selected_dates(data, period)
+    return selected_box(data)
+
+
+@callback(
+    [Output("selections", "data"), Output("filters", "data")]
+    + [Output(f"{chart}_filters", "data") for chart in CHART_DIMENSIONS],
+    [Input("filter_device", "value"), Input("filter_category", "value"), Input("select", "value")]
+    + [Input(graph, prop) for graph, prop in SELECTION_EVENTS],
+    [State("filter_period", "value"), State("selections", "data"), State("filters", "data")]
+    + [State(f"{chart}_filters", "data") for chart in CHART_DIMENSIONS],
+    prevent_initial_call=True,
+)
+@instrument
+def dispatch_filters(device_type, category, countries, *args):
+    # Único punto que traduce controles y selecciones en filtros. Solo se
+    # escriben los stores que cambian, así Dash recalcula únicamente las
+    # gráficas (y los KPI) cuyos filtros son distintos.
+    events = args[: len(SELECTION_EVENTS)]
+    period, selections, *previous = args[len(SELECTION_EVENTS) :]
+    selections = dict(selections or {})
+    for (graph, prop), data in zip(SELECTION_EVENTS, events):
+        if f"{graph}.{prop}" in ctx.triggered_prop_ids:
+            selections[graph] = selection_for(graph, prop, data, selections.get(graph), period)
+    filters = combine({"device_type": device_type, "category": category, "country": countries}, selections)
+    current = [filters] + [for_chart(filters, chart) for chart in CHART_DIMENSIONS]
+    return [selections] + [new if new != old else no_update for new, old in zip(current, previous)]
+
+
+@callback(
+    Output(component_id="profit_vs_cost", component_property="figure"),
+    *exact_outputs("profit_vs_cost"),
+    Input(component_id="seen_tabs", component_property="data"),
+    Input(component_id="profit_vs_cost_filters", component_property="data"),
+    Input(component_id="profit_vs_cost", component_property="relayoutData"),
+    Input(component_id="data_version", component_property="data"),
+    prevent_initial_call=True,
+    **heavy_callback_options("profit_vs_cost"),
+)
+@with_progress
+@deferred("analysis")
+@instrument
+def update_scatter(filters, relayout_data, version):
+    window = None
+    if ctx.triggered_id == "profit_vs_cost":
+        # Solo el modo densidad necesita re-agregar al hacer zoom; con puntos
+        # sueltos el navegador ya tiene todo lo necesario.
+        if not is_zoom_event(relayout_data) or render_mode(source.order_count(filters)) != "density":
+            raise PreventUpdate
+        window = visible_window(relayout_data)
+    return progressive(scatter_view, approximate_scatter_view)(filters, window)
+
+
+@figure_cache.memoize(ordered=RANGE_DIMENSIONS)
+def scatter_view(filters, window):
+    with phase("filter"):
+        density = render_mode(source.order_count(filters, window)) == "density"
+        if density:
+            counts, x_edges, y_edges = source.density(filters, window, DENSITY_BINS)
+        else:
+            cost, profit = source.points(filters, window)
+    report_progress(50)
+    with phase("figure"):
+        if density:
+            scatter_fig = density_figure(counts, x_edges, y_edges, window, color=primary_color)
+        else:
+            scatter_fig = points_figure(cost, profit, window, color=primary_color)
+        scatter_fig.update_layout(uirevision=json.dumps(active_filters(filters), sort_keys=True))
+    return scatter_fig
+
+
+def approximate_scatter_view(filters, window):
+    # Solo el modo densidad es lento; los puntos sueltos se piden exactos.
+    sample = store.state.sample
+    if sample is None:
+        return None
+    cost, profit, weight = sample.points(filters or {}, window)
+    if render_mode(weight.sum()) != "density":
+        return None
+    counts, x_edges, y_edges = histogram(cost, profit, window, DENSITY_BINS, weights=weight)
+    # Varianza del conteo de cada celda (aproximación de Poisson: sum w·(w-1)).
+    variance, _, _ = histogram(cost, profit, window, DENSITY_BINS, weights=weight * (weight - 1))
+    scatter_fig = density_figure(
+        counts, x_edges, y_edges, window, color=primary_color, title=approximate_title(sample, "Ganancia según el costo")
+    )
+    scatter_fig.update_traces(
+        customdata=(Z_95 * np.sqrt(variance)).T,
+        hovertemplate="cost=%{x}<br>profit=%{y}<br>pedidos=%{z:,.0f} ± %{customdata:,.0f}<extra></extra>",
+    )
+    scatter_fig.update_layout(uirevision=json.dumps(active_filters(filters), sort_keys=True))
+    return scatter_fig
+
+
+def scatter_request(args):
+    # JSON convierte la ventana en listas; scatter_view la espera en tuplas.
+    filters, window = args
+    if window is not None:
+        window = tuple(tuple(axis_range) if axis_range is not None else None for axis_range in window)
+    return filters, window
+
+
+def range_title(start, end, rollups):
+    total = rollups.range_sum(start, end)
+    return f"Costo del {start} al {end}: {abbreviate_number(total)}"
+
+
+def slider_view(selected_day, rollups):
+    # Ejes y título de la serie diaria hasta el día del slider.
+    selected_day = min(max(int(selected_day), 0), len(rollups) - 1)
+    start, end = rollups.labels[0], rollups.labels[selected_day]
+    low, high = rollups.cost_min[selected_day], rollups.cost_max[selected_day]
+    padding = (high - low) * 0.05 or 1
+    return [start, end], [float(low - padding), float(high + padding)], range_title(start, end, rollups)
+
+
+@instrument
+def update_time_cost(selected_day, period, filters=None, version=None, relayout_data=None, width=None):
+    rollups = store.state.crossfilter.rollups(filters)
+    max_points = target_points(width)
+    complete = len(rollups) <= max_points
+    window = None
+    if ctx.triggered_id == 'cost_datetime':
+        # Zoom del usuario: si la serie diaria se envió reducida, se vuelve a
+        # reducir solo la ventana visible.
+        if period != "All" or complete or not is_zoom_event(relayout_data):
+            raise PreventUpdate
+        window = visible_dates(relayout_data)
+        if window is not None:
+            fig = with_own_layout(time_cost_view(period, window, max_points, filters))
+            fig['layout']['xaxis']['range'] = list(window)
+            if "yaxis.range[0]" in relayout_data:
+                fig['layout']['yaxis']['range'] = [relayout_data["yaxis.range[0]"], relayout_data["yaxis.range[1]"]]
+            fig['layout']['title']['text'] = range_title(*window, rollups)
+            return fig
+    elif ctx.triggered_id == 'date-slider':
+        if period != "All":
+            raise PreventUpdate
+        x_range, y_range, title = slider_view(selected_day, rollups)
+        if complete:
+            # La serie diaria completa ya está en el navegador: solo se mueven los ejes.
+            patched_fig = Patch()
+            patched_fig['layout']['xaxis']['range'] = x_range
+            patched_fig['layout']['yaxis']['range'] = y_range
+            patched_fig['layout']['title']['text'] = title
+            return patched_fig
+        window = tuple(x_range)
+    fig = with_own_layout(time_cost_view(period, window, max_points, filters))
+    if period == "All":
+        x_range, y_range, title = slider_view(selected_day, rollups)
+        fig['layout']['xaxis']['range'] = x_range
+        fig['layout']['yaxis']['range'] = y_range
+        fig['layout']['title']['text'] = title
+    return fig
+
+
+def with_own_layout(fig):
+    # Las figuras de la caché se comparten: se copia el layout antes de
+    # cambiarle los ejes o el título (los datos no se tocan).
+    return dict(fig, layout=copy.deepcopy(fig["layout"]))
+
+
+@figure_cache.memoize(ordered=RANGE_DIMENSIONS)
+def time_cost_view(period, window=None, max_points=None, filters=None):
+    with phase("filter"):
+        rollups = store.state.crossfilter.rollups(filters)
+        filtered_df = period_series(period, rollups)
+        if window is not None:
+            # Solo la serie diaria se recorta: sus filas son los días de los agregados.
+            i, j = rollups.range_bounds(*window)
+            filtered_df = filtered_df.iloc[i:j]
+        if max_points is not None and len(filtered_df) > max_points:
+            if period == "All":
+                x = filtered_df['date'].to_numpy(dtype="datetime64[D]").astype("int64")
+            else:
+                x = np.arange(len(filtered_df))
+            filtered_df = filtered_df.iloc[lttb(x, filtered_df['cost'].to_numpy(), max_points)]
+    report_progress(50)
+    with phase("figure"):
+        fig = time_cost_figure(filtered_df)
+    return fig
+
+
+def time_cost_figure(filtered_df):
+    fig = px.line(filtered_df, x='date', y='cost')
+    fig.update_traces(line=dict(color=primary_color)) 
+    if COMPACT and pd.api.types.is_datetime64_any_dtype(filtered_df['date']):
+        # Fechas como milisegundos en un typed array en lugar de texto ISO.
+        fig.update_traces(x=epoch_ms(filtered_df['date']))
+        fig.update_xaxes(type='date')
+    fig.update_layout(
+        title={
+            'x':0.5,
+            'xanchor': 'center'
+        },
+        xaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            title='Fecha',
+        ),
+        yaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            title='Costo'
+        )
+    )
+    return fig
+
+
+# Add controls to build the interaction
+if CLIENTSIDE:
+    clientside_callback(
+        ClientsideFunction(namespace="tiendaeur", function_name="profitByCountry"),
+        Output(component_id="profit_country", component_property="figure"),
+        Input(component_id="filter_device", component_property="value"),
+        Input(component_id="aggregates", component_property="data"),
+        prevent_initial_call=True,
+    )
+    clientside_callback(
+        ClientsideFunction(namespace="tiendaeur", function_name="costByDevice"),
+        Output(component_id="cost_device", component_property="figure"),
+        Input(component_id="filter_category", component_property="value"),
+        Input(component_id="aggregates", component_property="data"),
+        prevent_initial_call=True,
+    )
+    clientside_callback(
+        ClientsideFunction(namespace="tiendaeur", function_name="timeCost"),
+        Output('cost_datetime', 'figure'),
+        [Input('date-slider', 'value'), Input('filter_period', 'value'), Input('aggregates', 'data')]
+    )
+else:
+    callback(
+        Output(component_id="profit_country", component_property="figure"),
+        *exact_outputs("profit_country"),
+        Input(component_id="seen_tabs", component_property="data"),
+        Input(component_id="profit_country_filters", component_property="data"),
+        Input(component_id="data_version", component_property="data"),
+        prevent_initial_call=True,
+    )(deferred("summary")(progressive(update_profit_country, approximate_profit_country)))
+    callback(
+        Output(component_id="cost_device", component_property="figure"),
+        *exact_outputs("cost_device"),
+        Input(component_id="seen_tabs", component_property="data"),
+        Input(component_id="cost_device_filters", component_property="data"),
+        Input(component_id="data_version", component_property="data"),
+        prevent_initial_call=True,
+    )(deferred("summary")(progressive(update_cost_device, approximate_cost_device)))
+    callback(
+        Output('cost_datetime', 'figure'),
+        [
+            Input('seen_tabs', 'data'),
+            Input('date-slider', 'value'),
+            Input('filter_period', 'value'),
+            Input('cost_datetime_filters', 'data'),
+            Input('data_version', 'data'),
+            Input('cost_datetime', 'relayoutData'),
+            Input('cost_datetime_width', 'data'),
+        ],
+        prevent_initial_call=True,
+        **heavy_callback_options("cost_datetime"),
+    )(with_progress(deferred("analysis")(update_time_cost)))
+
+
+# Figuras exactas del modo aproximado; con TIENDAEUR_BACKGROUND=1 se calculan
+# en un proceso aparte (ver jobs.py).
+exact_figures = {
+    "profit_country": (update_profit_country, None),
+    "cost_device": (update_cost_device, None),
+    "profit_vs_cost": (scatter_view, scatter_request),
+}
+for chart in PROGRESSIVE_CHARTS:
+    callback(
+        Output(chart, "figure", allow_duplicate=True),
+        Input(f"{chart}_exact", "data"),
+        prevent_initial_call=True,
+        **(dict(background=True, interval=POLL_MS) if BACKGROUND else {}),
+    )(swap_exact(*exact_figures[chart]))
+
+
+@callback(
+    Output("orders_page", "data") if COMPACT else Output("orders_table", "data"),
+    Output("orders_table", "page_count"),
+    Input("seen_tabs", "data"),
+    Input("orders_table", "page_current"),
+    Input("orders_table", "page_size"),
+    Input("orders_table", "sort_by"),
+    Input("orders_table", "filter_query"),
+    Input("data_version", "data"),
+    prevent_initial_call=True,
+)
+@deferred("data")
+@instrument
+def update_table(page_current, page_size, sort_by, filter_query, version):
+    return store.state.table.page(page_current, page_size, sort_by, filter_query, columnar=COMPACT)
+
+
+if COMPACT:
+    clientside_callback(
+        ClientsideFunction(namespace="tiendaeur", function_name="expandColumns"),
+        Output("orders_table", "data"),
+        Input("orders_page", "data"),
+    )
+
+
+@callback(
+    Output("data_version", "data"),
+    Input("refresh_interval", "n_intervals"),
+    State("data_version", "data"),
+    prevent_initial_call=True,
+)
+@instrument
+def check_data_version(n_intervals, version):
+    if store.version == version:
+        raise PreventUpdate
+    return store.version
+
+
+@callback(
+    Output("filter_category", "options"),
+    Output("select", "options"),
+    Output("date-slider", "max"),
+    Output("date-slider", "value"),
+    Output("aggregates", "data"),
+    Input("data_version", "data"),
+    State("date-slider", "value"),
+    State("date-slider", "max"),
+    prevent_initial_call=True,
+)
+@instrument
+def update_controls(version, selected_day, slider_max):
+    state = store.state
+    new_max = len(state.daily) - 1
+    # Si el slider estaba en el último día, sigue al último día.
+    selected_day = new_max if selected_day == slider_max else selected_day
+    return (
+        [{"label": "Todos", "value": "All"}] + category_options(state),
+        country_options(state),
+        new_max,
+        selected_day,
+        client_aggregates() if CLIENTSIDE else no_update,
+    )
+
+
+@callback(
+    [Output(card.id, "children") for card in KPI_CARDS]
+    + [Output(f"{card.id}_delta", "children") for card in KPI_CARDS],
+    Input("filters", "data"),
+    Input("filter_period", "value"),
+    Input("data_version", "data"),
+    prevent_initial_call=True,
+)
+@instrument
+def update_kpis(filters, period, version):
+    return kpi_values(store.state, filters or EMPTY_FILTERS, period)
+
+
+def kpi_values(state, filters, period):
+    # Valores y variaciones de las tarjetas, en el orden de las salidas de update_kpis.
+    with phase("filter"):
+        # Fechas y zona del scatter recortan las celdas; las columnas las
+        # filtra compute_kpis junto con los filtros propios de cada tarjeta.
+        cells = state.crossfilter.cells({"date": filters["date"], "window": filters["window"]})
+        columns = {column: filters[column] for column in ("device_type", "category", "country")}
+        values, deltas = compute_kpis(cells, columns, state.last_date, period_granularity[period])
+    return values.tolist() + deltas.tolist()
+
+
+# Las figuras por defecto se calculan al arrancar y con cada versión nueva,
+# no en la primera visita.
+warm_start(store.state)
+store.subscribe(warm_start)
@@ -0,0 +1,86 @@
+# Página de resumen: ganancias por país y costos por dispositivo.
+#
+# Antes era un dashboard aparte (appJHL.py) con su propia copia del dataset;
+# ahora usa las mismas figuras del servicio de datos que la página principal,
+# así una selección ya vista en cualquiera de las dos sale de la caché.
+import dash
+from dash import dcc, html, callback, Output, Input, State
+from dash.exceptions import PreventUpdate
+import dash_bootstrap_components as dbc
+
+from components import graph_column, prerender, summary_filters
+from crossfilter import EMPTY_FILTERS, combine
+from metrics import instrument
+from service import store, update_cost_device, update_profit_country
+from store import REFRESH_SECONDS
+
+dash.register_page(__name__, path="/resumen", name="Resumen", title="TiendaEUR Resumen")
+
+
+def layout(**query):
+    # Las figuras sin filtros ya están en la caché (ver `warm_start` en
+    # pages/dashboard.py): el layout las trae y los callbacks solo se lanzan
+    # al cambiar un filtro.
+    warm = prerender()
+    return html.Div(
+        children=[
+            summary_filters(store.state, "resumen_filter_device", "resumen_filter_category"),
+            dbc.Row(
+                [
+                    graph_column(
+                        "Ganancias por país",
+                        "resumen_profit_country",
+                        figure=update_profit_country(EMPTY_FILTERS, store.version) if warm else None,
+                    ),
+                    graph_column(
+                        "Costos según dispositivo",
+                        "resumen_cost_device",
+                        figure=update_cost_device(EMPTY_FILTERS, store.version) if warm else None,
+                    ),
+                ]
+            ),
+            # Versión del dataset que ve el navegador, como en la página
+            # principal: al cambiar se recalculan las figuras.
+            dcc.Store(id="resumen_data_version", data=store.version),
+            dcc.Interval(
+                id="resumen_refresh_interval", interval=max(REFRESH_SECONDS, 5) * 1000, disabled=REFRESH_SECONDS <= 0
+            ),
+        ],
+    )
+
+
+# Los filtros se traducen al mismo estado que usa la página principal: la
+# clave de la caché de figuras es la misma.
+@callback(
+    Output(component_id="resumen_profit_country", component_property="figure"),
+    Input(component_id="resumen_filter_device", component_property="value"),
+    Input(component_id="resumen_data_version", component_property="data"),
+    prevent_initial_call=True,
+)
+@instrument
+def update_summary_profit_country(device_type, version):
+    return update_profit_country(combine({"device_type": device_type}, {}), version)
+
+
+@callback(
+    Output(component_id="resumen_cost_device", component_property="figure"),
+    Input(component_id="resumen_filter_category", component_property="value"),
+    Input(component_id="resumen_data_version", component_property="data"),
+    prevent_initial_call=True,
+)
+@instrument
+def update_summary_cost_device(category, version):
+    return update_cost_device(combine({"category": category}, {}), version)
+
+
+@callback(
+    Output("resumen_data_version", "data"),
+    Input("resumen_refresh_interval", "n_intervals"),
+    State("resumen_data_version", "data"),
+    prevent_initial_call=True,
+)
+@instrument
+def check_summary_data_version(n_intervals, version):
+    if store.version == version:
+        raise PreventUpdate
+    return store.version
@@ -0,0 +1,70 @@
+# Agregados temporales precalculados por día, semana, mes, trimestre y año.
+#
+# Se construyen una sola vez a partir de la serie diaria (una fila por día con
+# coste y ganancia). Cada granularidad se agrupa por (año, periodo), de modo
+# que marzo de 2022 y marzo de 2023 son puntos distintos. Las sumas sobre un
+# rango de fechas se resuelven con sumas prefijas y búsqueda binaria sobre
+# las fechas ordenadas: O(log n) por consulta, sin máscaras sobre la serie.
+import numpy as np
+import pandas as pd
+
+MEASURES = ["cost", "profit"]
+GRANULARITIES = ["Day", "Week", "Month", "Quarter", "Year"]
+
+
+def _period_keys(dates, granularity):
+    if granularity == "Day":
+        return dates.dt.year, dates.dt.dayofyear
+    if granularity == "Week":
+        # Semana ISO: su año puede no coincidir con el del calendario.
+        iso = dates.dt.isocalendar()
+        return iso["year"].astype("int64"), iso["week"].astype("int64")
+    if granularity == "Month":
+        return dates.dt.year, dates.dt.month
+    if granularity == "Quarter":
+        return dates.dt.year, dates.dt.quarter
+    if granularity == "Year":
+        return dates.dt.year, pd.Series(0, index=dates.index)
+    raise ValueError(f"Granularidad desconocida: {granularity}")
+
+
+class TimeRollups:
+    def __init__(self, daily):
+        daily = daily.sort_values("date", ignore_index=True)
+        self.dates = daily["date"].to_numpy(dtype="datetime64[D]")
+        self.labels = np.datetime_as_string(self.dates, unit="D")
+        # prefix[m][i] = suma de los i primeros días.
+        self._prefix = {
+            measure: np.concatenate([[0.0], np.cumsum(daily[measure].to_numpy(dtype="float64"))])
+            for measure in MEASURES
+        }
+        # Extremos acumulados del coste diario: el rango del eje Y para
+        # cualquier posición del slider se obtiene en O(1).
+        self.cost_min = daily["cost"].cummin().to_numpy()
+        self.cost_max = daily["cost"].cummax().to_numpy()
+        self._levels = {}
+        for granularity in GRANULARITIES:
+            year, period = _period_keys(daily["date"], granularity)
+            self._levels[granularity] = (
+                daily.groupby([year.rename("year"), period.rename("period")], sort=True)
+                .agg(start=("date", "min"), cost=("cost", "sum"), profit=("profit", "sum"))
+                .reset_index()
+            )
+
+    def __len__(self):
+        return len(self.dates)
+
+    def series(self, granularity):
+        """Una fila por (año, periodo) con su primer día y las sumas de cada medida."""
+        return self._levels[granularity]
+
+    def range_bounds(self, start, end):
+        # Posiciones [i, j) de los días entre `start` y `end`, ambos incluidos.
+        i = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        j = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        return int(i), int(max(i, j))
+
+    def range_sum(self, start, end, measure="cost"):
+        i, j = self.range_bounds(start, end)
+        prefix = self._prefix[measure]
+        return float(prefix[j] - prefix[i])
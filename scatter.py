@@ -0,0 +1,109 @@
+# Dibujo adaptativo de la nube "Ganancia según el costo".
+#
+# Con pocos pedidos se envían los puntos tal cual; por encima de
+# WEBGL_THRESHOLD se usa Scattergl y por encima de DENSITY_THRESHOLD se envía
+# un histograma 2D calculado en el servidor, que se recalcula para la ventana
+# visible cada vez que el usuario hace zoom. Los puntos o los conteos los
+# entrega la fuente de datos (ver sources.py).
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+WEBGL_THRESHOLD = int(os.environ.get("TIENDAEUR_WEBGL_THRESHOLD", 10_000))
+DENSITY_THRESHOLD = int(os.environ.get("TIENDAEUR_DENSITY_THRESHOLD", 100_000))
+DENSITY_BINS = int(os.environ.get("TIENDAEUR_DENSITY_BINS", 200))
+
+
+def render_mode(n_points):
+    if n_points > DENSITY_THRESHOLD:
+        return "density"
+    if n_points > WEBGL_THRESHOLD:
+        return "webgl"
+    return "svg"
+
+
+def _axis_range(relayout_data, axis):
+    if f"{axis}.range[0]" in relayout_data and f"{axis}.range[1]" in relayout_data:
+        return (float(relayout_data[f"{axis}.range[0]"]), float(relayout_data[f"{axis}.range[1]"]))
+    if f"{axis}.range" in relayout_data:
+        low, high = relayout_data[f"{axis}.range"]
+        return (float(low), float(high))
+    return None
+
+
+def is_zoom_event(relayout_data):
+    if not relayout_data:
+        return False
+    return any(key.startswith(("xaxis.range", "yaxis.range", "xaxis.autorange", "yaxis.autorange")) for key in relayout_data)
+
+
+def visible_window(relayout_data):
+    # ((x0, x1), (y0, y1)) de la ventana visible; None en un eje = sin recorte.
+    if not relayout_data or relayout_data.get("xaxis.autorange") or relayout_data.get("autosize"):
+        return None
+    window = (_axis_range(relayout_data, "xaxis"), _axis_range(relayout_data, "yaxis"))
+    return None if window == (None, None) else window
+
+
+def clip_to_window(cost, profit, window=None):
+    cost = np.asarray(cost, dtype=float)
+    profit = np.asarray(profit, dtype=float)
+    if window is None:
+        return cost, profit
+    mask = np.ones(len(cost), dtype=bool)
+    for values, axis_range in zip((cost, profit), window):
+        if axis_range is not None:
+            low, high = sorted(axis_range)
+            mask &= (values >= low) & (values <= high)
+    return cost[mask], profit[mask]
+
+
+def histogram(cost, profit, window=None, bins=DENSITY_BINS, weights=None):
+    # (conteos, bordes X, bordes Y); sin ventana completa se usa la extensión de los datos.
+    # Los pedidos sin importe (profit NaN) no caen en ninguna celda.
+    known = np.isfinite(cost) & np.isfinite(profit)
+    if not known.all():
+        cost, profit = np.asarray(cost)[known], np.asarray(profit)[known]
+        weights = None if weights is None else np.asarray(weights)[known]
+    bin_range = None
+    if window is not None and None not in window:
+        bin_range = [sorted(window[0]), sorted(window[1])]
+    return np.histogram2d(cost, profit, bins=bins, range=bin_range, weights=weights)
+
+
+def _figure(trace, window, title):
+    fig = go.Figure(trace)
+    fig.update_layout(title=title, xaxis_title="cost", yaxis_title="profit")
+    if window is not None:
+        if window[0] is not None:
+            fig.update_xaxes(range=list(window[0]))
+        if window[1] is not None:
+            fig.update_yaxes(range=list(window[1]))
+    return fig
+
+
+def points_figure(cost, profit, window=None, color="#A1343C", title="Ganancia según el costo"):
+    trace_type = go.Scattergl if render_mode(len(cost)) == "webgl" else go.Scatter
+    trace = trace_type(
+        x=cost,
+        y=profit,
+        mode="markers",
+        marker=dict(color=color),
+        hovertemplate="cost=%{x}<br>profit=%{y}<extra></extra>",
+    )
+    return _figure(trace, window, title)
+
+
+def density_figure(counts, x_edges, y_edges, window=None, color="#A1343C", title="Ganancia según el costo"):
+    counts = np.asarray(counts, dtype=float)
+    counts[counts == 0] = np.nan
+    trace = go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=counts.T,
+        colorscale=[[0, "#f2d7d9"], [1, color]],
+        colorbar=dict(title="Pedidos"),
+        hovertemplate="cost=%{x}<br>profit=%{y}<br>pedidos=%{z}<extra></extra>",
+    )
+    return _figure(trace, window, title)
@@ -0,0 +1,117 @@
+# Servicio de datos compartido por todas las páginas del dashboard (ver pages/).
+#
+# El proceso carga una sola vez el dataset y sus agregados (DataState, ver
+# store.py), la fuente de datos de los callbacks y la caché de figuras. Los
+# callbacks de cada página leen de aquí; las figuras que comparten las
+# páginas ("Ganancias por país", "Costos según dispositivo") se calculan con
+# las mismas funciones y ocupan una sola entrada de la caché.
+import plotly.express as px
+import plotly.graph_objects as go
+
+from approx import APPROX
+from components import primary_color
+from crossfilter import RANGE_DIMENSIONS, view_key
+from figcache import figure_cache
+from metrics import add_gauge, instrument, phase
+from sources import DataSource
+from store import DataStore
+
+store = DataStore()
+figure_cache.set_version(store.version)
+store.subscribe(lambda state: figure_cache.set_version(state.version))
+# Estado de la caché de figuras en /metrics (por proceso).
+add_gauge("tiendaeur_figure_cache_hits_total", "Figuras servidas desde la caché.", lambda: figure_cache.hits, "counter")
+add_gauge(
+    "tiendaeur_figure_cache_misses_total", "Figuras calculadas por no estar en la caché.", lambda: figure_cache.misses, "counter"
+)
+add_gauge("tiendaeur_figure_cache_bytes", "Bytes de JSON de las figuras en la caché.", lambda: figure_cache.size_bytes)
+add_gauge("tiendaeur_figure_cache_entries", "Figuras en la caché.", lambda: len(figure_cache))
+if APPROX:
+    # La muestra se toma al cargar (y al llegar pedidos nuevos), no en la
+    # primera consulta.
+    store.state.sample
+    store.subscribe(lambda state: state.sample)
+store.start_refresher()
+source = DataSource(store)
+print(store.state.df.info())
+
+
+def approximate_title(sample, title=None):
+    note = f"Estimación con {len(sample):,} pedidos de muestra (IC 95 %) · calculando el valor exacto…"
+    return note if title is None else f"{title}<br><sup>{note}</sup>"
+
+
+@instrument
+@figure_cache.memoize(ordered=RANGE_DIMENSIONS)
+def update_profit_country(filters=None, version=None):
+    with phase("filter"):
+        profit = source.profit_by_country(filters)
+    with phase("figure"):
+        fig = px.bar(
+            profit,
+            x="country",
+            y="profit",
+            color_discrete_sequence=[primary_color],
+        )
+    return fig
+
+
+@instrument
+@figure_cache.memoize(ordered=RANGE_DIMENSIONS)
+def update_cost_device(filters=None, version=None):
+    with phase("filter"):
+        state = store.state
+        category = view_key(filters, "category")
+        if category is not None:
+            cost = state.cube.cost_by_device(category)
+        else:
+            cells = state.crossfilter.cells(filters)
+            cost = cells.groupby("device_type", observed=True)["cost"].sum().reset_index()
+    with phase("figure"):
+        pie_fig = px.pie(
+            cost,
+            values="cost",
+            names="device_type",
+            color_discrete_sequence=px.colors.sequential.RdBu,
+        )
+    return pie_fig
+
+
+# Las estimaciones se dibujan con graph_objects: plotly express tarda más
+# en montar la figura que la muestra en responder.
+def approximate_profit_country(filters=None, version=None):
+    # Sin filtros, o solo por dispositivo, la vista del cubo ya es inmediata.
+    sample = store.state.sample
+    if sample is None or view_key(filters, "device_type") is not None:
+        return None
+    profit = sample.grouped_sum(filters, "country", "profit")
+    fig = go.Figure(
+        go.Bar(
+            x=profit["country"],
+            y=profit["profit"],
+            error_y=dict(type="data", array=profit["ci"]),
+            customdata=profit["ci"],
+            marker_color=primary_color,
+            hovertemplate="country=%{x}<br>profit=%{y:,.0f} ± %{customdata:,.0f}<extra></extra>",
+        )
+    )
+    fig.update_layout(title=approximate_title(sample), xaxis_title="country", yaxis_title="profit")
+    return fig
+
+
+def approximate_cost_device(filters=None, version=None):
+    sample = store.state.sample
+    if sample is None or view_key(filters, "category") is not None:
+        return None
+    cost = sample.grouped_sum(filters, "device_type", "cost")
+    pie_fig = go.Figure(
+        go.Pie(
+            labels=cost["device_type"],
+            values=cost["cost"],
+            customdata=cost["ci"],
+            marker_colors=px.colors.sequential.RdBu,
+            hovertemplate="%{label}: %{value:,.0f} ± %{customdata:,.0f}<extra></extra>",
+        )
+    )
+    pie_fig.update_layout(title=approximate_title(sample))
+    return pie_fig
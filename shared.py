@@ -0,0 +1,81 @@
+# Dataset compartido entre los workers de gunicorn.
+#
+# El proceso maestro (ver gunicorn.conf.py) publica el dataset limpio y sus
+# agregados como ficheros Arrow IPC sin comprimir. Cada worker los abre con
+# memory-map y los convierte a pandas sin copiar las columnas, así que todos
+# comparten las mismas páginas de memoria del sistema operativo y añadir
+# workers no multiplica la RAM.
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+
+import pyarrow as pa
+
+from data import CACHE_DIR, arrow_to_pandas, write_json
+
+SHARED = os.environ.get("TIENDAEUR_SHARED") == "1"
+SHARED_DIR = os.environ.get("TIENDAEUR_SHARED_DIR", os.path.join(CACHE_DIR, "shared"))
+
+TABLES = ("orders", "cells", "daily")
+META_NAME = "shared.json"
+LOCK_NAME = "shared.lock"
+
+
+def _write_table(frame, path):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    # Los workers que aún mapean el fichero anterior conservan su inodo.
+    os.replace(tmp, path)
+
+
+def _read_table(path):
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return arrow_to_pandas(table, split_blocks=True)
+
+
+def read_shared_meta(shared_dir=SHARED_DIR):
+    try:
+        with open(os.path.join(shared_dir, META_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def shared_lock(shared_dir=SHARED_DIR):
+    # Solo un proceso a la vez publica o refresca el dataset compartido.
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(os.path.join(shared_dir, LOCK_NAME), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def publish(state, meta, shared_dir=SHARED_DIR):
+    os.makedirs(shared_dir, exist_ok=True)
+    frames = {"orders": state.df, "cells": state.cube.cells, "daily": state.daily}
+    for name in TABLES:
+        _write_table(frames[name], os.path.join(shared_dir, f"{name}.arrow"))
+    # Los metadatos se escriben al final: señalan que la versión está completa.
+    write_json(os.path.join(shared_dir, META_NAME), meta)
+
+
+def attach(shared_dir=SHARED_DIR):
+    """Devuelve ({nombre: DataFrame}, metadatos) de la versión publicada."""
+    meta = read_shared_meta(shared_dir)
+    frames = {name: _read_table(os.path.join(shared_dir, f"{name}.arrow")) for name in TABLES}
+    return frames, meta
+
+
+def prepare(shared_dir=SHARED_DIR):
+    # Se llama en el maestro antes de crear los workers.
+    from store import DataStore
+
+    store = DataStore(shared=False)
+    with shared_lock(shared_dir):
+        store.publish(shared_dir)
@@ -0,0 +1,358 @@
+# Fuentes de datos de los callbacks "Ganancias por país" y "Ganancia según el costo".
+#
+# TIENDAEUR_BACKEND elige la implementación:
+# - "pandas" (por defecto): consulta el cubo y la vista del filtrado cruzado
+#   (ver crossfilter.py) en memoria.
+# - "sqlite" / "duckdb": envía los filtros y las agregaciones a la base de
+#   datos como consultas GROUP BY parametrizadas, con un pool de conexiones.
+#   Si no se indica TIENDAEUR_SQL_PATH, cada versión del dataset se exporta
+#   a CACHE_DIR/sql/orders-<versión>.<ext> la primera vez que se necesita;
+#   se conservan las KEEP_EXPORTS más recientes, porque un worker que aún no
+#   ha refrescado puede abrir una conexión nueva a la anterior.
+#
+# Las consultas son textos constantes con parámetros, así cada conexión
+# prepara cada sentencia una sola vez y la reutiliza (caché de sentencias
+# de sqlite3, prepared statements de duckdb).
+import json
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from bitmap import INDEXED_COLUMNS
+from crossfilter import view_key
+from data import CACHE_DIR
+from scatter import DENSITY_BINS, clip_to_window, histogram
+
+BACKEND = os.environ.get("TIENDAEUR_BACKEND", "pandas")
+SQL_PATH = os.environ.get("TIENDAEUR_SQL_PATH")
+SQL_DIR = os.path.join(CACHE_DIR, "sql")
+POOL_SIZE = int(os.environ.get("TIENDAEUR_SQL_POOL", 4))
+KEEP_EXPORTS = 2
+
+
+class PandasSource:
+    def __init__(self, store):
+        self.store = store
+
+    def profit_by_country(self, filters=None):
+        state = self.store.state
+        device_type = view_key(filters, "device_type")
+        if device_type is not None:
+            return state.cube.profit_by_country(device_type)
+        cells = state.crossfilter.cells(filters)
+        return cells.groupby("country", observed=True)["profit"].sum().reset_index()
+
+    def points(self, filters=None, window=None):
+        state = self.store.state
+        cost = state.df["cost"].to_numpy()
+        profit = state.df["profit"].to_numpy()
+        positions = state.crossfilter.positions(filters or {})
+        if positions is not None:
+            cost, profit = cost[positions], profit[positions]
+        return clip_to_window(cost, profit, window)
+
+    def order_count(self, filters=None, window=None):
+        if window is None:
+            return self.store.state.crossfilter.count(filters or {})
+        return len(self.points(filters, window)[0])
+
+    def density(self, filters=None, window=None, bins=DENSITY_BINS):
+        return histogram(*self.points(filters, window), window, bins)
+
+
+class ConnectionPool:
+    """Hasta `size` conexiones reutilizables; si están todas en uso se espera.
+
+    `close` cierra las conexiones libres y las que están en uso al
+    devolverlas; cuando ya no queda ninguna abierta se llama a `on_closed`.
+    """
+
+    def __init__(self, connect, size=POOL_SIZE, on_closed=None):
+        self._connect = connect
+        self._size = size
+        self._on_closed = on_closed
+        self._created = 0
+        self._open = 0
+        self._closed = False
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        try:
+            con = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                # Cerrado el pool, una consulta rezagada usa una conexión de un solo uso.
+                create = self._closed or self._created < self._size
+                if create:
+                    self._created += 1
+                    self._open += 1
+            con = self._connect() if create else self._idle.get()
+        try:
+            yield con
+        finally:
+            with self._lock:
+                closed = self._closed
+            if closed:
+                self._discard(con)
+            else:
+                self._idle.put(con)
+
+    def _discard(self, con):
+        con.close()
+        with self._lock:
+            self._open -= 1
+            last = self._open == 0
+        if last and self._on_closed is not None:
+            self._on_closed()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            last = self._open == 0
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        if last and self._on_closed is not None:
+            self._on_closed()
+
+
+# Ventana del scatter: cada eje es opcional, así el texto de la consulta es fijo.
+WINDOW_SQL = "(? IS NULL OR cost BETWEEN ? AND ?) AND (? IS NULL OR profit BETWEEN ? AND ?)"
+DATE_SQL = "(? IS NULL OR (date >= ? AND date < ?))"
+
+
+def _window_params(window):
+    params = []
+    for axis_range in window or (None, None):
+        low, high = sorted(axis_range) if axis_range is not None else (None, None)
+        params += [low, low, high]
+    return params
+
+
+class SqlSource(ABC):
+    """Consultas comunes a los motores SQL; cada motor define cómo se conecta
+    y cómo pasa listas de valores y fechas como parámetros."""
+
+    # Filtro por lista de valores con un solo parámetro (depende del motor).
+    VALUES_SQL = None
+
+    def __init__(self, path, pool_size=POOL_SIZE, on_closed=None):
+        self.path = path
+        self.pool = ConnectionPool(self.connect, pool_size, on_closed)
+        # Filtros del dashboard (ver crossfilter.py), zona seleccionada en el
+        # scatter y ventana visible del zoom.
+        where = " AND ".join(
+            [self.VALUES_SQL.format(column=column) for column in INDEXED_COLUMNS] + [DATE_SQL, WINDOW_SQL, WINDOW_SQL]
+        )
+        self.sql = {
+            "profit": f"SELECT country, SUM(profit) AS profit FROM orders WHERE {where} GROUP BY country ORDER BY country",
+            "count": f"SELECT COUNT(*) FROM orders WHERE {where}",
+            "points": f"SELECT cost, profit FROM orders WHERE {where}",
+            "extent": f"SELECT MIN(cost), MAX(cost), MIN(profit), MAX(profit) FROM orders WHERE {where}",
+            "density": (
+                "SELECT CAST((cost - ?) / ? AS INTEGER) AS bx, CAST((profit - ?) / ? AS INTEGER) AS by_, "
+                f"COUNT(*) FROM orders WHERE {where} AND cost IS NOT NULL AND profit IS NOT NULL GROUP BY bx, by_"
+            ),
+        }
+
+    @abstractmethod
+    def connect(self):
+        """Conexión nueva de solo lectura (la usa el pool)."""
+
+    def close(self):
+        # Las consultas en curso terminan; sus conexiones se cierran al devolverlas.
+        self.pool.close()
+
+    @abstractmethod
+    def values_param(self, values):
+        """Parámetro de VALUES_SQL con la lista de valores."""
+
+    @abstractmethod
+    def date_param(self, date):
+        """Parámetro de DATE_SQL para un pd.Timestamp."""
+
+    def _query(self, name, params=()):
+        with self.pool.connection() as con:
+            return con.execute(self.sql[name], params).fetchall()
+
+    def _where_params(self, filters, window):
+        filters = filters or {}
+        params = []
+        for column in INDEXED_COLUMNS:
+            values = filters.get(column)
+            values = self.values_param(values) if values is not None else None
+            params += [values, values]
+        dates = filters.get("date")
+        if dates is None:
+            params += [None, None, None]
+        else:
+            start, end = pd.Timestamp(dates[0]), pd.Timestamp(dates[1]) + pd.Timedelta(days=1)
+            params += [1, self.date_param(start), self.date_param(end)]
+        return params + _window_params(filters.get("window")) + _window_params(window)
+
+    def profit_by_country(self, filters=None):
+        rows = self._query("profit", self._where_params(filters, None))
+        return pd.DataFrame(rows, columns=["country", "profit"])
+
+    def order_count(self, filters=None, window=None):
+        return int(self._query("count", self._where_params(filters, window))[0][0])
+
+    def points(self, filters=None, window=None):
+        rows = self._query("points", self._where_params(filters, window))
+        values = np.array(rows, dtype=float).reshape(-1, 2)
+        return values[:, 0], values[:, 1]
+
+    def density(self, filters=None, window=None, bins=DENSITY_BINS):
+        where_params = self._where_params(filters, window)
+        if window is not None and None not in window:
+            (x0, x1), (y0, y1) = sorted(window[0]), sorted(window[1])
+        else:
+            x0, x1, y0, y1 = self._query("extent", where_params)[0]
+        dx = (x1 - x0) / bins or 1.0
+        dy = (y1 - y0) / bins or 1.0
+        rows = self._query("density", [x0, dx, y0, dy] + where_params)
+        counts = np.zeros((bins, bins))
+        if rows:
+            cells = np.array(rows, dtype=np.int64)
+            # El máximo cae justo en el borde derecho: va al último cubo, como en numpy.
+            bx, by = np.clip(cells[:, 0], 0, bins - 1), np.clip(cells[:, 1], 0, bins - 1)
+            np.add.at(counts, (bx, by), cells[:, 2])
+        return counts, np.linspace(x0, x1, bins + 1), np.linspace(y0, y1, bins + 1)
+
+
+class SqliteSource(SqlSource):
+    VALUES_SQL = "(? IS NULL OR {column} IN (SELECT value FROM json_each(?)))"
+    EXTENSION = "sqlite"
+
+    def connect(self):
+        import sqlite3
+
+        return sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False, cached_statements=len(self.sql)
+        )
+
+    def values_param(self, values):
+        return json.dumps(list(values))
+
+    def date_param(self, date):
+        # to_sql guarda las fechas como texto "YYYY-MM-DD HH:MM:SS".
+        return date.strftime("%Y-%m-%d")
+
+    @staticmethod
+    def export(df, path):
+        import sqlite3
+
+        con = sqlite3.connect(path)
+        try:
+            df.astype({column: str for column in df.select_dtypes("category").columns}).to_sql(
+                "orders", con, index=False, chunksize=100_000
+            )
+            con.execute("CREATE INDEX orders_device_country ON orders (device_type, country)")
+            con.execute("CREATE INDEX orders_country ON orders (country)")
+            con.commit()
+        finally:
+            con.close()
+
+
+class DuckdbSource(SqlSource):
+    VALUES_SQL = "(? IS NULL OR list_contains(?, {column}))"
+    EXTENSION = "duckdb"
+
+    def __init__(self, path, pool_size=POOL_SIZE):
+        import duckdb
+
+        # Los cursores de duckdb son conexiones independientes a la misma base,
+        # que se cierra cuando se ha cerrado el último.
+        self._database = duckdb.connect(path, read_only=True)
+        super().__init__(path, pool_size, on_closed=self._database.close)
+
+    def connect(self):
+        return self._database.cursor()
+
+    def values_param(self, values):
+        return list(values)
+
+    def date_param(self, date):
+        return date.to_pydatetime()
+
+    @staticmethod
+    def export(df, path):
+        import duckdb
+
+        con = duckdb.connect(path)
+        try:
+            con.register("orders_frame", df)
+            con.execute("CREATE TABLE orders AS SELECT * FROM orders_frame")
+        finally:
+            con.close()
+
+
+SQL_BACKENDS = {"sqlite": SqliteSource, "duckdb": DuckdbSource}
+
+
+def exported_path(state, backend):
+    # Un fichero por versión: los workers que comparten CACHE_DIR lo reutilizan.
+    source_class = SQL_BACKENDS[backend]
+    path = os.path.join(SQL_DIR, f"orders-{state.version[:16]}.{source_class.EXTENSION}")
+    if not os.path.exists(path):
+        os.makedirs(SQL_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        source_class.export(state.df, tmp)
+        os.replace(tmp, path)
+    return path
+
+
+def remove_old_exports(backend, keep, count=KEEP_EXPORTS):
+    """Borra las exportaciones salvo las `count` más recientes (y `keep`)."""
+    extension = SQL_BACKENDS[backend].EXTENSION
+    exports = []
+    for name in os.listdir(SQL_DIR):
+        path = os.path.join(SQL_DIR, name)
+        try:
+            if name.endswith(f".{extension}"):
+                exports.append((os.path.getmtime(path), path))
+        except OSError:
+            # Otro worker lo acaba de borrar.
+            continue
+    for _, path in sorted(exports, reverse=True)[count:]:
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class DataSource:
+    """Fuente activa; con exportación automática se renueva en cada versión del dataset."""
+
+    def __init__(self, store, backend=BACKEND, sql_path=SQL_PATH):
+        self.store = store
+        self.backend = backend
+        if backend == "pandas":
+            self.current = PandasSource(store)
+        elif backend not in SQL_BACKENDS:
+            raise ValueError(f"TIENDAEUR_BACKEND desconocido: {backend}")
+        elif sql_path is not None:
+            self.current = SQL_BACKENDS[backend](sql_path)
+        else:
+            self.current = SQL_BACKENDS[backend](exported_path(store.state, backend))
+            store.subscribe(self._on_refresh)
+
+    def _on_refresh(self, state):
+        previous = self.current
+        self.current = SQL_BACKENDS[self.backend](exported_path(state, self.backend))
+        previous.close()
+        remove_old_exports(self.backend, keep=self.current.path)
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
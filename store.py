@@ -0,0 +1,182 @@
+# Estado compartido del dataset y refresco incremental en segundo plano.
+#
+# `DataState` agrupa el dataset y todo lo que se deriva de él (cubo, backend
+# de la tabla, serie diaria y sus agregados temporales, vista del filtrado
+# cruzado, muestra estratificada, opciones de los filtros). Nunca se
+# modifica: al llegar pedidos nuevos se construye otro estado a partir del
+# anterior y se sustituye de una vez, así los callbacks en curso siguen
+# viendo una versión coherente.
+import hashlib
+import os
+import threading
+import time
+from functools import cached_property
+
+import pandas as pd
+
+from approx import SAMPLE_ROWS, StratifiedSample
+from bitmap import BitmapIndex
+from crossfilter import CrossFilter
+from cube import Cube
+from data import (
+    CACHE_DIR,
+    MAX_DELTAS,
+    SNAPSHOT_TTL,
+    SOURCE,
+    align_categories,
+    append_snapshot,
+    load_snapshot,
+    read_new_rows,
+    write_snapshot,
+)
+from shared import SHARED, SHARED_DIR, attach, publish, read_shared_meta, shared_lock
+from rollups import TimeRollups
+from table import TableBackend
+
+REFRESH_SECONDS = float(os.environ.get("TIENDAEUR_REFRESH_SECONDS", 300))
+
+
+class DataState:
+    def __init__(self, df, version, cube=None, daily=None):
+        self.df = df
+        self.version = version
+        self.cube = cube if cube is not None else Cube(df)
+        self.daily = daily if daily is not None else self.cube.daily()
+        self.rollups = TimeRollups(self.daily)
+        self.categories = self.cube.cells["category"].unique()
+        self.countries = self.cube.cells["country"].unique()
+        self.last_date = df["date"].max()
+
+    @cached_property
+    def bitmaps(self):
+        # Se construye en la primera consulta que lo necesita.
+        return BitmapIndex(self.df)
+
+    @cached_property
+    def table(self):
+        return TableBackend(self.df, self.bitmaps)
+
+    @cached_property
+    def crossfilter(self):
+        return CrossFilter(self)
+
+    @cached_property
+    def sample(self):
+        # Muestra del modo aproximado; None si el dataset ya es pequeño.
+        if len(self.df) <= SAMPLE_ROWS:
+            return None
+        return StratifiedSample(self.df)
+
+    def appended(self, rows, version):
+        # Solo se recorren las filas nuevas; el resto se combina por grupos.
+        new_daily = (
+            rows.groupby(rows["date"].dt.normalize())[["cost", "profit"]].sum().rename_axis("date").reset_index()
+        )
+        daily = (
+            pd.concat([self.daily, new_daily], ignore_index=True)
+            .groupby("date", observed=True)[["cost", "profit"]]
+            .sum()
+            .reset_index()
+        )
+        df, rows = align_categories(self.df.copy(deep=False), rows)
+        return DataState(
+            pd.concat([df, rows], ignore_index=True),
+            version,
+            cube=self.cube.appended(rows),
+            daily=daily,
+        )
+
+
+class DataStore:
+    def __init__(self, source=SOURCE, ttl=SNAPSHOT_TTL, cache_dir=CACHE_DIR, shared=SHARED, shared_dir=SHARED_DIR):
+        self.source = source
+        self.cache_dir = cache_dir
+        # En modo compartido el dataset lo publica el maestro de gunicorn y
+        # este proceso solo lo mapea (ver shared.py).
+        self.shared_dir = shared_dir if shared else None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+        if self.shared_dir is not None:
+            with shared_lock(self.shared_dir):
+                if read_shared_meta(self.shared_dir) is None:
+                    self._load(*load_snapshot(source, ttl, cache_dir))
+                    self.publish(self.shared_dir)
+                else:
+                    self._attach()
+        else:
+            self._load(*load_snapshot(source, ttl, cache_dir))
+
+    def _load(self, df, meta):
+        self.meta = meta
+        self.state = DataState(df, meta["hash"])
+
+    def _attach(self):
+        frames, self.meta = attach(self.shared_dir)
+        self.state = DataState(
+            frames["orders"], self.meta["hash"], cube=Cube(cells=frames["cells"]), daily=frames["daily"]
+        )
+
+    def publish(self, shared_dir=SHARED_DIR):
+        publish(self.state, self.meta, shared_dir)
+
+    @property
+    def version(self):
+        return self.state.version
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def refresh(self):
+        """Ingiere los pedidos añadidos a la fuente. Devuelve True si hubo cambios."""
+        with self._lock:
+            if self.shared_dir is None:
+                changed = self._append_new_rows()
+            else:
+                with shared_lock(self.shared_dir):
+                    published = read_shared_meta(self.shared_dir)
+                    if published is not None and published["hash"] != self.meta["hash"]:
+                        # Otro worker ya ingirió los pedidos nuevos.
+                        self._attach()
+                        changed = True
+                    else:
+                        changed = self._append_new_rows()
+                        if changed:
+                            self.publish(self.shared_dir)
+            state = self.state
+        if changed:
+            for listener in self._listeners:
+                listener(state)
+        return changed
+
+    def _append_new_rows(self):
+        meta = self.meta
+        rows, offset = read_new_rows(self.source, meta["size"], meta["columns"], self.state.last_date, self.cache_dir)
+        if rows is None or rows.empty:
+            self.meta = dict(meta, size=offset)
+            return False
+        version = hashlib.sha256(f"{meta['hash']}:{offset}".encode()).hexdigest()
+        state = self.state.appended(rows, version)
+        meta = dict(meta, hash=version, size=offset, fetched_at=time.time())
+        # En disco solo se añaden las filas nuevas; cada MAX_DELTAS refrescos
+        # se reescribe la instantánea para no acumular ficheros.
+        if len(meta.get("deltas", [])) < MAX_DELTAS:
+            self.meta = append_snapshot(rows, meta, self.cache_dir)
+        else:
+            self.meta = write_snapshot(state.df, meta, self.cache_dir)
+        self.state = state
+        return True
+
+    def start_refresher(self, interval=REFRESH_SECONDS):
+        if interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._refresh_loop, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _refresh_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception as error:
+                print(f"Error al refrescar los datos desde {self.source}: {error}")
@@ -0,0 +1,154 @@
+# Paginado, ordenación y filtrado del DataTable en el servidor.
+#
+# El navegador solo recibe la página visible. Cada orden de columna se calcula
+# una vez con argsort y se reutiliza, así que avanzar de página sin filtro
+# cuesta O(page_size).
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+FILTER_OPERATORS = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "],
+]
+
+
+def split_filter_part(filter_part):
+    # Traduce una parte de `filter_query` ("{cost} > 100") a (columna, operador, valor).
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find("{") + 1 : name_part.rfind("}")]
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ""
+                if v0 == value_part[-1:] and v0 in ("'", '"', "`"):
+                    value = value_part[1:-1].replace("\\" + v0, v0)
+                elif operator_type[0] in ("contains ", "datestartswith "):
+                    value = value_part
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                # Los operadores con palabra ("eq ", "ge ", ...) se devuelven sin espacio.
+                return name, operator_type[0].strip(), value
+
+    return [None] * 3
+
+
+def _compare(values, operator, filter_value):
+    # None si la parte no filtra: operador desconocido o valor que no se
+    # puede comparar con la columna ("{cost} > abc"); como en el filtrado de
+    # la propia DataTable, la expresión inválida se ignora.
+    if operator in ("eq", "ne", "lt", "le", "gt", "ge"):
+        try:
+            part = getattr(values, operator)(filter_value)
+        except (TypeError, ValueError):
+            return None
+    elif operator == "contains":
+        part = values.astype(str).str.contains(str(filter_value), regex=False)
+    elif operator == "datestartswith":
+        part = values.astype(str).str.startswith(str(filter_value))
+    else:
+        return None
+    return part.fillna(False).to_numpy(dtype=bool)
+
+
+def filter_mask(df, filter_query, bitmaps=None):
+    mask = np.ones(len(df), dtype=bool)
+    packed = None
+    for filter_part in filter_query.split(" && "):
+        col_name, operator, filter_value = split_filter_part(filter_part)
+        if col_name not in df.columns:
+            continue
+        if bitmaps is not None and operator == "eq" and col_name in bitmaps.columns:
+            # Igualdades sobre columnas indexadas: AND de bitsets empaquetados.
+            bits = bitmaps.bitmap(col_name, [filter_value])
+            packed = bits if packed is None else np.bitwise_and(packed, bits)
+            continue
+        column = df[col_name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Se evalúa sobre las categorías y se expande con los códigos
+            # enteros; el código -1 (nulo) apunta al False añadido al final.
+            part = _compare(pd.Series(column.cat.categories), operator, filter_value)
+            if part is not None:
+                part = np.append(part, False)[column.cat.codes.to_numpy()]
+        else:
+            part = _compare(column, operator, filter_value)
+        if part is not None:
+            mask &= part
+    if packed is not None:
+        mask &= np.unpackbits(packed, count=len(df)).astype(bool)
+    return mask
+
+
+class TableBackend:
+    def __init__(self, df, bitmaps=None):
+        self.df = df
+        self.bitmaps = bitmaps
+        self._rank = lru_cache(maxsize=None)(self._compute_rank)
+        self._order = lru_cache(maxsize=32)(self._compute_order)
+        self._positions = lru_cache(maxsize=32)(self._compute_positions)
+
+    def _compute_rank(self, column):
+        # Rango denso de cada fila; los nulos quedan al final.
+        values = self.df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Orden alfabético de las categorías (las añadidas en un refresco
+            # van al final de la lista), trasladado a los códigos enteros.
+            categories = values.cat.categories
+            category_rank = np.empty(len(categories) + 1, dtype=np.int64)
+            category_rank[np.argsort(categories.to_numpy(), kind="stable")] = np.arange(len(categories))
+            category_rank[-1] = len(categories)
+            return category_rank[values.cat.codes.to_numpy()], len(categories)
+        codes, uniques = pd.factorize(values, sort=True)
+        codes = codes.astype(np.int64)
+        codes[codes == -1] = len(uniques)
+        return codes, len(uniques)
+
+    def _sort_key(self, column, direction):
+        rank, nulls = self._rank(column)
+        if direction != "desc":
+            return rank
+        return np.where(rank == nulls, nulls, -rank)
+
+    def _compute_order(self, sort_by):
+        keys = [self._sort_key(column, direction) for column, direction in reversed(sort_by)]
+        if len(keys) == 1:
+            return np.argsort(keys[0], kind="stable")
+        return np.lexsort(keys)
+
+    def _compute_positions(self, sort_by, filter_query):
+        order = self._order(sort_by) if sort_by else None
+        if not filter_query:
+            return order
+        mask = filter_mask(self.df, filter_query, self.bitmaps)
+        if order is None:
+            return np.flatnonzero(mask)
+        return order[mask[order]]
+
+    def page(self, page_current, page_size, sort_by=None, filter_query="", columnar=False):
+        sort_key = tuple((s["column_id"], s["direction"]) for s in sort_by or [])
+        positions = self._positions(sort_key, filter_query or "")
+        total = len(self.df) if positions is None else len(positions)
+        start = page_current * page_size
+        stop = start + page_size
+        if positions is None:
+            page = self.df.iloc[start:stop]
+        else:
+            page = self.df.iloc[positions[start:stop]]
+        page_count = max(1, -(-total // page_size))
+        if columnar:
+            # {columna: valores}: sin repetir los nombres en cada fila.
+            return {column: page[column].tolist() for column in page.columns}, page_count
+        return page.to_dict("records"), page_count
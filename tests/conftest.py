@@ -0,0 +1,11 @@
+# Las pruebas usan el CSV de ejemplo (data/tiendaeur_sample.csv) y una caché
+# temporal: data.py lee las variables de entorno al importarse.
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TIENDAEUR_SOURCE", os.path.join(ROOT, "data", "tiendaeur_sample.csv"))
+os.environ.setdefault("TIENDAEUR_CACHE_DIR", tempfile.mkdtemp(prefix="tiendaeur-tests-"))
+os.environ.setdefault("TIENDAEUR_REFRESH_SECONDS", "0")
@@ -0,0 +1,50 @@
+import pandas as pd
+
+import data
+
+
+def read_fixture():
+    return data.read_csv(data.FIXTURE_PATH)
+
+
+def test_read_csv_types():
+    df = read_fixture()
+    assert len(df) == 121
+    assert list(df.columns) == ["date", "country", "category", "device_type", "cost", "order_value_EUR", "profit"]
+    for column in ("country", "category", "device_type"):
+        assert isinstance(df[column].dtype, pd.CategoricalDtype)
+        assert list(df[column].cat.categories) == sorted(df[column].cat.categories)
+    assert pd.api.types.is_datetime64_dtype(df["date"])
+    assert df["cost"].dtype == "float64"
+    assert df["order_value_EUR"].dtype == "float64"
+
+
+def test_read_csv_thousands_separator_and_profit():
+    df = read_fixture()
+    # 1/31/2022,Italy,Fashion,Tablet,688.79,"1,430.95"
+    row = df[(df["date"] == "2022-01-31") & (df["country"] == "Italy")].iloc[0]
+    assert row["order_value_EUR"] == 1430.95
+    assert row["profit"] == 1430.95 - 688.79
+    known = df["order_value_EUR"].notna()
+    assert (df.loc[known, "profit"] == df.loc[known, "order_value_EUR"] - df.loc[known, "cost"]).all()
+
+
+def test_read_csv_blank_amount_is_nan():
+    df = read_fixture()
+    # 3/26/2022,Germany,Books,PC,412.5,
+    row = df[(df["date"] == "2022-03-26") & (df["country"] == "Germany")].iloc[0]
+    assert row["cost"] == 412.5
+    assert pd.isna(row["order_value_EUR"]) and pd.isna(row["profit"])
+    assert df["order_value_EUR"].isna().sum() == 1
+
+
+def test_snapshot_round_trip(tmp_path):
+    meta = data.refresh_snapshot(data.FIXTURE_PATH, str(tmp_path))
+    df, loaded_meta = data.load_snapshot(data.FIXTURE_PATH, cache_dir=str(tmp_path))
+    assert loaded_meta == meta
+    assert df.equals(read_fixture())
+    assert meta["columns"] == ["date", "country", "category", "device_type", "cost", "order_value_EUR"]
+
+    # Mismo contenido: no se regenera la instantánea ni cambia la versión.
+    again = data.refresh_snapshot(data.FIXTURE_PATH, str(tmp_path))
+    assert again["hash"] == meta["hash"]
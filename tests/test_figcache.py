@@ -0,0 +1,52 @@
+import plotly.graph_objects as go
+
+from figcache import FigureCache
+
+
+def make_cache():
+    cache = FigureCache()
+    cache.set_version("v1")
+    return cache
+
+
+def test_memoize_returns_cached_figure_without_recomputing():
+    cache = make_cache()
+    calls = []
+
+    @cache.memoize
+    def figure(filters):
+        calls.append(filters)
+        return go.Figure(go.Bar(x=["a", "b"], y=[1, 2]))
+
+    first = figure({"country": ["b", "a"]})
+    assert figure({"country": ["a", "b"]}) is first
+    assert calls == [{"country": ["b", "a"]}]
+    assert figure.cached({"country": ["a"]}) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_range_dimensions_keep_their_order():
+    cache = make_cache()
+
+    @cache.memoize(ordered=("window",))
+    def figure(filters):
+        return {"data": [], "layout": {"title": {"text": str(filters["window"])}}}
+
+    box = figure({"window": [[1, 2], [3, 4]]})
+    swapped = figure({"window": [[3, 4], [1, 2]]})
+    assert box["layout"]["title"]["text"] != swapped["layout"]["title"]["text"]
+
+
+def test_size_limit_evicts_oldest():
+    cache = FigureCache(max_bytes=300)
+    cache.set_version("v1")
+
+    @cache.memoize
+    def figure(n):
+        return {"data": [{"y": list(range(20))}], "layout": {"title": {"text": str(n)}}}
+
+    for n in range(5):
+        figure(n)
+    assert 0 < cache.size_bytes <= 300
+    assert figure.cached(4) is not None
+    assert figure.cached(0) is None
@@ -0,0 +1,32 @@
+import threading
+import time
+
+import diskcache
+from dash import DiskcacheManager
+
+from jobs import SharedJobManager
+
+
+def test_identical_requests_share_one_process(tmp_path, monkeypatch):
+    spawned = []
+
+    def spawn(self, key, job_fn, args, context):
+        time.sleep(0.05)
+        spawned.append(key)
+        return 4242
+
+    monkeypatch.setattr(DiskcacheManager, "call_job_fn", spawn)
+    monkeypatch.setattr(SharedJobManager, "job_running", lambda self, job: int(job) == 4242)
+    manager = SharedJobManager(diskcache.Cache(str(tmp_path)))
+    jobs = []
+    threads = [
+        threading.Thread(target=lambda: jobs.append(manager.call_job_fn("key", None, (), {}))) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert spawned == ["key"]
+    assert jobs == [4242] * 4
+    assert manager.handle.get("key-job") == (4242, 4)
@@ -0,0 +1,20 @@
+import metrics
+
+
+def test_captured_observations_merge_into_another_process():
+    with metrics.capture() as observations:
+        with metrics.phase("filter"):
+            pass
+    assert [(name, labels) for name, labels, _ in observations] == [
+        ("tiendaeur_callback_phase_seconds", ("-", "filter"))
+    ]
+    metrics.merge([("tiendaeur_callback_phase_seconds", ["update_scatter", "callback"], 0.2)])
+    assert 'tiendaeur_callback_phase_seconds_count{callback="update_scatter",phase="callback"} 1' in metrics.render()
+
+
+def test_gauges_are_read_on_render(monkeypatch):
+    monkeypatch.setattr(metrics, "_gauges", [])
+    values = iter([3, 5])
+    metrics.add_gauge("tiendaeur_test_total", "Prueba.", lambda: next(values), "counter")
+    assert "# TYPE tiendaeur_test_total counter\ntiendaeur_test_total 3" in metrics.render()
+    assert "tiendaeur_test_total 5" in metrics.render()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data
+from crossfilter import EMPTY_FILTERS
+from sources import PandasSource, SqliteSource, SqlSource
+from store import DataStore
+
+FILTERS = [
+    {},
+    dict(EMPTY_FILTERS),
+    dict(EMPTY_FILTERS, device_type=["PC"]),
+    dict(EMPTY_FILTERS, country=["France", "Spain"], category=["Books", "Home"]),
+    dict(EMPTY_FILTERS, date=["2022-03-01", "2022-08-31"]),
+    dict(EMPTY_FILTERS, device_type=["Mobile", "Tablet"], window=[[100, 600], [-50, 400]]),
+    dict(EMPTY_FILTERS, country=["Atlantis"]),
+]
+WINDOWS = [None, [[200, 800], [0, 500]], [None, [-100, 300]]]
+
+
+@pytest.fixture(scope="module")
+def sources(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("sources")
+    store = DataStore(source=data.FIXTURE_PATH, cache_dir=str(tmp_path), shared=False)
+    path = str(tmp_path / "orders.sqlite")
+    SqliteSource.export(store.state.df, path)
+    sql = SqliteSource(path)
+    yield PandasSource(store), sql
+    sql.close()
+
+
+def sorted_points(points):
+    cost, profit = np.round(points[0], 6), np.round(points[1], 6)
+    order = np.lexsort((profit, cost))
+    return cost[order], profit[order]
+
+
+def test_sql_source_is_abstract():
+    with pytest.raises(TypeError):
+        SqlSource("orders.sqlite")
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_profit_by_country_matches_pandas(sources, filters):
+    pandas_source, sql_source = sources
+    expected = pandas_source.profit_by_country(filters)
+    expected = expected.astype({"country": str}).sort_values("country").reset_index(drop=True)
+    actual = sql_source.profit_by_country(filters)
+    pd.testing.assert_frame_equal(actual, expected[["country", "profit"]], check_dtype=False)
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+@pytest.mark.parametrize("filters", FILTERS)
+def test_points_count_and_density_match_pandas(sources, filters, window):
+    pandas_source, sql_source = sources
+    assert sql_source.order_count(filters, window) == pandas_source.order_count(filters, window)
+    for actual, expected in zip(
+        sorted_points(sql_source.points(filters, window)), sorted_points(pandas_source.points(filters, window))
+    ):
+        np.testing.assert_array_equal(actual, expected)
+    if pandas_source.order_count(filters, window) == 0:
+        return
+    for actual, expected in zip(sql_source.density(filters, window), pandas_source.density(filters, window)):
+        np.testing.assert_allclose(actual, expected)
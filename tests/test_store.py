@@ -0,0 +1,81 @@
+import shutil
+
+import data
+from store import DataStore
+
+NEW_ROWS = b"12/30/2022,Spain,Books,PC,100.00,250.50\r\n12/31/2022,Italy,Sports,Mobile,200.00,\"1,200.00\"\r\n"
+
+
+def source_copy(tmp_path):
+    path = tmp_path / "source.csv"
+    shutil.copy(data.FIXTURE_PATH, path)
+    return str(path)
+
+
+def append(path, content):
+    with open(path, "ab") as f:
+        f.write(content)
+
+
+def make_store(source, tmp_path, **kwargs):
+    return DataStore(source=source, ttl=3600, cache_dir=str(tmp_path / "cache"), **kwargs)
+
+
+def test_half_written_line_waits_for_the_next_refresh(tmp_path):
+    source = source_copy(tmp_path)
+    store = make_store(source, tmp_path, shared=False)
+    rows = len(store.state.df)
+    append(source, NEW_ROWS[:60])
+    assert store.refresh()
+    assert len(store.state.df) == rows + 1
+    append(source, NEW_ROWS[60:])
+    assert store.refresh()
+    assert len(store.state.df) == rows + 2
+    assert store.state.df["order_value_EUR"].iloc[-1] == 1200.0
+    assert not store.refresh()
+
+
+def test_append_then_reload(tmp_path):
+    source = source_copy(tmp_path)
+    store = make_store(source, tmp_path, shared=False)
+    snapshot = tmp_path / "cache" / data.SNAPSHOT_NAME
+    modified = snapshot.stat().st_mtime_ns
+    append(source, NEW_ROWS)
+    assert store.refresh()
+    # La instantánea base no se reescribe: las filas van a un delta.
+    assert snapshot.stat().st_mtime_ns == modified
+    assert len(store.meta["deltas"]) == 1
+
+    reloaded = make_store(source, tmp_path, shared=False)
+    assert reloaded.version == store.version
+    assert reloaded.state.df.equals(store.state.df)
+    assert reloaded.state.df.dtypes.equals(store.state.df.dtypes)
+
+
+def test_deltas_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr("store.MAX_DELTAS", 1)
+    source = source_copy(tmp_path)
+    store = make_store(source, tmp_path, shared=False)
+    append(source, NEW_ROWS[:41])
+    assert store.refresh()
+    append(source, NEW_ROWS[41:])
+    assert store.refresh()
+    assert store.meta["deltas"] == []
+    assert not list((tmp_path / "cache").glob(data.DELTA_NAME.format("*")))
+    reloaded = make_store(source, tmp_path, shared=False)
+    assert reloaded.state.df.equals(store.state.df)
+
+
+def test_shared_workers_agree_on_the_version(tmp_path):
+    source = source_copy(tmp_path)
+    shared_dir = str(tmp_path / "shared")
+    first = make_store(source, tmp_path, shared=True, shared_dir=shared_dir)
+    second = make_store(source, tmp_path, shared=True, shared_dir=shared_dir)
+    assert first.version == second.version
+    append(source, NEW_ROWS)
+    assert first.refresh()
+    # El segundo no vuelve a leer la fuente: mapea lo que publicó el primero.
+    assert second.refresh()
+    assert second.version == first.version
+    assert second.state.df.equals(first.state.df)
+    assert not second.refresh()
@@ -0,0 +1,10 @@
+import data
+from table import filter_mask
+
+
+def test_invalid_comparison_is_ignored():
+    df = data.read_csv(data.FIXTURE_PATH)
+    assert filter_mask(df, "{cost} > abc").all()
+    assert filter_mask(df, "{date} > abc").all()
+    # Las demás partes de la consulta siguen filtrando.
+    assert (filter_mask(df, "{cost} > 500 && {cost} < abc") == (df["cost"] > 500).to_numpy()).all()
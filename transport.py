@@ -0,0 +1,41 @@
+# Transporte compacto de figuras, agregados y páginas de la tabla.
+#
+# Con TIENDAEUR_COMPACT=1 (por defecto):
+# - los arrays numéricos viajan como typed arrays en base64
+#   ({"dtype": "f8", "bdata": ...}), que plotly.js decodifica sin pasar por
+#   listas JSON; las fechas de la serie diaria se envían como milisegundos
+#   desde epoch sobre un eje de tipo "date";
+# - las páginas de la tabla se envían por columnas y el navegador las
+#   convierte en filas (ver expandColumns en assets/clientside.js);
+# - las respuestas se comprimen con brotli o gzip si está instalado
+#   flask-compress (`pip install flask-compress`).
+import base64
+import os
+
+import numpy as np
+
+COMPACT = os.environ.get("TIENDAEUR_COMPACT", "1") == "1"
+COMPRESS_ALGORITHMS = ["br", "gzip"]
+COMPRESS_MIN_SIZE = 500
+
+
+def typed_array(values, dtype="f8"):
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder("<"))
+    return {"dtype": dtype, "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
+
+
+def epoch_ms(dates):
+    return np.asarray(dates, dtype="datetime64[ms]").astype("int64").astype("float64")
+
+
+def init_transport(server):
+    if not COMPACT:
+        return
+    try:
+        from flask_compress import Compress
+    except ImportError:
+        print("flask-compress no está instalado: las respuestas se envían sin comprimir.")
+        return
+    server.config.setdefault("COMPRESS_ALGORITHM", COMPRESS_ALGORITHMS)
+    server.config.setdefault("COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)
+    Compress(server)